@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def inline_thumbnails(settings):
+    """
+    Миниатюры создаются в потоке запроса: поток пула писал бы во
+    временный MEDIA_ROOT теста, пока тот удаляется, а общая база
+    SQLite в памяти не ждет снятия блокировок.
+    """
+    settings.THUMBNAIL_WORKERS = 0
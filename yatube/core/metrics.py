@@ -0,0 +1,258 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+# Пространства имен URL, запросы к которым попадают в метрики.
+NAMESPACES = ('posts', 'users', 'about')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SECTION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Имя метрики: (тип, описание, границы корзин гистограммы).
+METRICS = {
+    'yatube_http_request_duration_seconds': (
+        'histogram', 'Время ответа представления.', LATENCY_BUCKETS,
+    ),
+    'yatube_http_responses_total': (
+        'counter', 'Ответы представления по кодам статуса.', None,
+    ),
+    'yatube_db_queries_per_request': (
+        'histogram', 'Число SQL-запросов на один запрос.', QUERIES_BUCKETS,
+    ),
+    'yatube_cache_requests_total': (
+        'counter', 'Чтения из кэша: попадания (hit) и промахи (miss).', None,
+    ),
+    'yatube_section_duration_seconds': (
+        'histogram',
+        'Участки, отмеченные core.middleware.timed(): '
+        'например, создание миниатюр.',
+        SECTION_BUCKETS,
+    ),
+}
+CACHE_HIT_RATIO = 'yatube_cache_hit_ratio'
+
+
+class Registry:
+    """
+    Метрики процесса в памяти с выгрузкой в общий каталог.
+
+    Каждый процесс раз в METRICS_FLUSH_INTERVAL секунд (и при
+    выходе) записывает свои значения целиком в файл <pid>.json
+    каталога METRICS_DIR, а /metrics складывает файлы всех
+    процессов. Так счетчики нескольких воркеров gunicorn/uwsgi
+    сходятся без общего сервера; файлы завершившихся процессов
+    остаются, чтобы суммы не уменьшались. Без METRICS_DIR видны
+    только метрики текущего процесса.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.pid = os.getpid()
+            self.values = {}
+            self.flushed = 0.0
+
+    def _check_fork(self):
+        # Процесс, созданный fork после импорта, получает копию
+        # значений родителя; их уже посчитал родитель.
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.values = {}
+            self.flushed = 0.0
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self._check_fork()
+            self.values[key] = self.values.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self._check_fork()
+            counts, total = self.values.get(
+                key, ([0] * (len(buckets) + 1), 0.0)
+            )
+            index = next(
+                (number for number, bound in enumerate(buckets)
+                 if value <= bound),
+                len(buckets),
+            )
+            counts[index] += 1
+            self.values[key] = (counts, total + value)
+
+    def flush(self, force=False):
+        """Записывает значения процесса в его файл, если пора."""
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        now = time.monotonic()
+        with self.lock:
+            self._check_fork()
+            if not force and now - self.flushed < (
+                settings.METRICS_FLUSH_INTERVAL
+            ):
+                return
+            self.flushed = now
+            data = [
+                [name, labels, value]
+                for (name, labels), value in self.values.items()
+            ]
+            path = os.path.join(directory, f'{self.pid}.json')
+        os.makedirs(directory, exist_ok=True)
+        temporary = f'{path}.{threading.get_ident()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as target:
+            json.dump(data, target, ensure_ascii=False)
+        os.replace(temporary, path)
+
+    def collect(self):
+        """Значения всех процессов: {(имя, метки): значение}."""
+        directory = settings.METRICS_DIR
+        if not directory:
+            with self.lock:
+                self._check_fork()
+                return dict(self.values)
+        self.flush(force=True)
+        merged = {}
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            try:
+                with open(path, encoding='utf-8') as source:
+                    data = json.load(source)
+            except (OSError, ValueError):
+                continue
+            for name, labels, value in data:
+                if name not in METRICS:
+                    continue
+                _merge(merged, (name, tuple(map(tuple, labels))), value)
+        return merged
+
+
+def _merge(merged, key, value):
+    previous = merged.get(key)
+    if previous is None:
+        merged[key] = value
+    elif isinstance(value, list):
+        counts, total = previous
+        merged[key] = (
+            [left + right for left, right in zip(counts, value[0])],
+            total + value[1],
+        )
+    else:
+        merged[key] = previous + value
+
+
+registry = Registry()
+atexit.register(lambda: registry.flush(force=True))
+
+
+def observe_request(request, response, timing, total):
+    """Метрики запроса к представлению из NAMESPACES."""
+    match = request.resolver_match
+    if match is None or match.namespace not in NAMESPACES:
+        return
+    view = {'view': match.view_name}
+    registry.observe('yatube_http_request_duration_seconds', view, total)
+    registry.inc(
+        'yatube_http_responses_total',
+        {**view, 'status': str(response.status_code)},
+    )
+    registry.observe(
+        'yatube_db_queries_per_request', view, timing.db_queries
+    )
+    if timing.cache_hits:
+        registry.inc(
+            'yatube_cache_requests_total',
+            {**view, 'result': 'hit'}, timing.cache_hits,
+        )
+    if timing.cache_misses:
+        registry.inc(
+            'yatube_cache_requests_total',
+            {**view, 'result': 'miss'}, timing.cache_misses,
+        )
+    registry.flush()
+
+
+def observe_section(name, seconds):
+    registry.observe(
+        'yatube_section_duration_seconds', {'section': name}, seconds
+    )
+
+
+def _escape(value):
+    return (
+        value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    )
+
+
+def _labels(labels, **extra):
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(str(value))}"' for name, value in pairs
+    ) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def exposition():
+    """Метрики всех процессов в текстовом формате Prometheus."""
+    values = sorted(registry.collect().items())
+    lines = []
+    for name, (kind, description, buckets) in METRICS.items():
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+        for (metric, labels), value in values:
+            if metric != name:
+                continue
+            if kind == 'counter':
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                continue
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip((*buckets, '+Inf'), counts):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{_labels(labels, le=bound)} {cumulative}'
+                )
+            lines.append(f'{name}_sum{_labels(labels)} {_number(total)}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+    lines += _hit_ratios(values)
+    return '\n'.join(lines) + '\n'
+
+
+def _hit_ratios(values):
+    """Доля попаданий в кэш по представлениям из счетчиков чтений."""
+    reads = {}
+    for (metric, labels), value in values:
+        if metric != 'yatube_cache_requests_total':
+            continue
+        labels = dict(labels)
+        hits, total = reads.get(labels['view'], (0, 0))
+        if labels['result'] == 'hit':
+            hits += value
+        reads[labels['view']] = (hits, total + value)
+    lines = [
+        f'# HELP {CACHE_HIT_RATIO} Доля попаданий среди чтений из кэша.',
+        f'# TYPE {CACHE_HIT_RATIO} gauge',
+    ]
+    lines += [
+        f'{CACHE_HIT_RATIO}{_labels([("view", view)])} {hits / total!r}'
+        for view, (hits, total) in sorted(reads.items())
+    ]
+    return lines
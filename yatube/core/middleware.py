@@ -0,0 +1,209 @@
+import contextvars
+import json
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.backends.django import Template
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('request_timing', default=None)
+_MISSING = object()
+
+
+class RequestTiming:
+    """Затраты одного запроса: SQL, шаблоны, кэш и именованные участки."""
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_depth = 0
+        self.sections = {}
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.db_queries += 1
+
+    def header(self, total):
+        metrics = [
+            f'db;dur={self.db_seconds * 1000:.1f};'
+            f'desc="{self.db_queries} queries"',
+            f'tpl;dur={self.template_seconds * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits, '
+            f'{self.cache_misses} misses"',
+        ]
+        metrics += [
+            f'{name};dur={seconds * 1000:.1f}'
+            for name, seconds in self.sections.items()
+        ]
+        metrics.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(metrics)
+
+
+@contextmanager
+def timed(name):
+    """
+    Добавляет время участка кода к текущему запросу, например
+    создание миниатюр в потоке запроса, и в гистограмму участков
+    core.metrics — в том числе вне запроса, в пуле потоков.
+    """
+    timing = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        metrics.observe_section(name, seconds)
+        if timing is not None:
+            timing.sections[name] = (
+                timing.sections.get(name, 0.0) + seconds
+            )
+
+
+def _timed_render(render):
+    """
+    Время отрисовки шаблонов без вложенных отрисовок (они уже внутри
+    внешней) и без SQL ленивых querysets, который учтен как db.
+    """
+    def wrapper(self, context=None, request=None):
+        timing = _current.get()
+        if timing is None or timing.template_depth:
+            return render(self, context, request)
+        timing.template_depth += 1
+        started, db_before = time.perf_counter(), timing.db_seconds
+        try:
+            return render(self, context, request)
+        finally:
+            timing.template_depth -= 1
+            timing.template_seconds += (
+                time.perf_counter() - started
+                - (timing.db_seconds - db_before)
+            )
+    wrapper.instrumented = True
+    return wrapper
+
+
+def _counted_get(get):
+    """
+    Попадание или промах get. DatabaseCache.get в Django 2.2 читает
+    через get_many — вложенные вызовы, как и в _counted_get_many,
+    не считаются повторно.
+    """
+    def wrapper(self, key, default=None, version=None):
+        timing = _current.get()
+        if timing is None or timing.cache_depth:
+            return get(self, key, default, version)
+        timing.cache_depth += 1
+        try:
+            value = get(self, key, _MISSING, version)
+        finally:
+            timing.cache_depth -= 1
+        if value is _MISSING:
+            timing.cache_misses += 1
+            return default
+        timing.cache_hits += 1
+        return value
+    wrapper.instrumented = True
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    """
+    Попадания и промахи get_many. BaseCache.get_many (его наследует,
+    например, LocMemCache) вызывает get на каждый ключ — такие вызовы
+    не считаются повторно.
+    """
+    def wrapper(self, keys, version=None):
+        timing = _current.get()
+        if timing is None or timing.cache_depth:
+            return get_many(self, keys, version)
+        keys = list(keys)
+        timing.cache_depth += 1
+        try:
+            values = get_many(self, keys, version)
+        finally:
+            timing.cache_depth -= 1
+        timing.cache_hits += len(values)
+        timing.cache_misses += len(keys) - len(values)
+        return values
+    wrapper.instrumented = True
+    return wrapper
+
+
+def _instrument():
+    """Оборачивает отрисовку шаблонов и чтение из кэшей (один раз)."""
+    if not getattr(Template.render, 'instrumented', False):
+        Template.render = _timed_render(Template.render)
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        if not getattr(backend.get, 'instrumented', False):
+            backend.get = _counted_get(backend.get)
+        if not getattr(backend.get_many, 'instrumented', False):
+            backend.get_many = _counted_get_many(backend.get_many)
+
+
+class ServerTimingMiddleware:
+    """
+    Профиль каждого запроса: время и число SQL-запросов, время
+    шаблонов, попадания и промахи кэша и участки, отмеченные timed().
+
+    Данные уходят в заголовок Server-Timing (его показывают
+    инструменты разработчика браузера) и строкой JSON в лог
+    core.middleware с ключом view — resolver_match.view_name, а
+    запросы к posts, users и about — еще и в метрики core.metrics.
+    Накладные расходы — несколько вызовов perf_counter на запрос
+    к БД и шаблон, поэтому middleware можно держать и в бою.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _instrument()
+
+    def __call__(self, request):
+        timing = RequestTiming()
+        token = _current.set(timing)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timing.record_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+        metrics.observe_request(request, response, timing, total)
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = timing.header(total)
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'view': match.view_name if match else None,
+            'method': request.method,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 1),
+            'db_ms': round(timing.db_seconds * 1000, 1),
+            'db_queries': timing.db_queries,
+            'template_ms': round(timing.template_seconds * 1000, 1),
+            'cache_hits': timing.cache_hits,
+            'cache_misses': timing.cache_misses,
+            **{
+                f'{name}_ms': round(seconds * 1000, 1)
+                for name, seconds in timing.sections.items()
+            },
+        }))
+        return response
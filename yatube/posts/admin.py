@@ -1,6 +1,63 @@
+from django.conf import settings
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
 
+from .counters import total_posts
+from .fts import FTS_TABLE
 from .models import Comment, Follow, Group, Post
+from .search import fts_query
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Число постов для changelist без точного COUNT(*) по всей таблице.
+
+    Без фильтров берется кэшированный счетчик постов, с фильтрами
+    строки считаются не дальше ADMIN_COUNT_CAP: страницы за этой
+    границей недоступны, зато запрос стоит одинаково на любой
+    таблице.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            return total_posts()
+        return queryset.values('pk')[:settings.ADMIN_COUNT_CAP].count()
+
+
+class PreloadedAutocompleteSelect(AutocompleteSelect):
+    """
+    Автодополнение, которое показывает уже загруженный выбранный
+    объект, а не ищет его отдельным запросом в каждой строке.
+    """
+    selected = None
+
+    def optgroups(self, name, value, attr=None):
+        selected = self.selected
+        if selected is None or [str(selected.pk)] != value:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        options.append(self.create_option(
+            name, selected.pk, str(selected), True, len(options)
+        ))
+        return [(None, options, 0)]
+
+
+class PostChangeListForm(forms.ModelForm):
+    """Строка changelist: группа поста загружена list_select_related."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        widget = self.fields['group'].widget
+        widget = getattr(widget, 'widget', widget)
+        widget.selected = self.instance.group
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -12,12 +69,59 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('group',)
+    raw_id_fields = ('author',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    ordering = ('-pub_date', '-pk')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+    def get_changelist_form(self, request, **kwargs):
+        return PostChangeListForm
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'group':
+            kwargs['widget'] = PreloadedAutocompleteSelect(
+                db_field.remote_field,
+                self.admin_site,
+                using=kwargs.get('using'),
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по тексту через индекс FTS5 вместо LIKE '%...%'."""
+        query = fts_query(search_term)
+        if connection.vendor != 'sqlite' or not query:
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        # RawSQL в pk__in оборачивается в лишние скобки, и SQLite
+        # берет из такого подзапроса только первую строку.
+        matches = queryset.extra(
+            where=[
+                f'posts_post.id IN (SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s)'
+            ],
+            params=[query],
+        )
+        return matches, False
+
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'title',
+        'slug',
+        'posts_count',
+    )
+    search_fields = ('title', 'slug')
     empty_value_display = '-пусто-'
 
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment)
 admin.site.register(Follow)
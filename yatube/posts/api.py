@@ -0,0 +1,198 @@
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                set_response_etag)
+
+from .models import Group, Post
+from .page_cache import cache_page_versioned
+from .utils import CursorPaginator
+
+User = get_user_model()
+
+# Поле ответа: (колонки для only(), функция получения значения).
+FIELDS = {
+    'id': (('id',), lambda post: post.id),
+    'text': (('text',), lambda post: post.text),
+    'pub_date': (('pub_date',), lambda post: post.pub_date),
+    'updated': (('updated',), lambda post: post.updated),
+    'author': (
+        ('author', 'author__username'), lambda post: post.author.username
+    ),
+    'group': (
+        ('group', 'group__slug'),
+        lambda post: post.group.slug if post.group_id else None,
+    ),
+    'image': (
+        ('image',), lambda post: post.image.url if post.image else None
+    ),
+    'comments_count': (
+        ('comments_count',), lambda post: post.comments_count
+    ),
+}
+COMMENTS_FIELD = 'comments'
+
+# Без пробелов и \u-экранирования: ответ на треть короче.
+JSON_OPTIONS = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+class ApiError(Exception):
+    """Ошибка в параметрах запроса к API (ответ 400)."""
+
+
+def api_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_OPTIONS)
+
+
+def api_view(view):
+    """
+    Оборачивает представление API: ошибки отдаются в JSON, а успешный
+    ответ получает строгий ETag по содержимому. Клиент с совпадающим
+    If-None-Match получает 304 без тела.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            response = view(request, *args, **kwargs)
+        except ApiError as error:
+            return api_response({'detail': str(error)}, status=400)
+        except Http404:
+            return api_response({'detail': 'Не найдено.'}, status=404)
+        if response.status_code != 200:
+            return response
+        set_response_etag(response)
+        patch_cache_control(response, no_cache=True)
+        return get_conditional_response(
+            request, etag=response.get('ETag'), response=response
+        )
+    return wrapper
+
+
+def _fields(request, extra=()):
+    """
+    Поля из ?fields=a,b; по умолчанию — все из FIELDS. Поля extra
+    дорогие и отдаются, только если их запросили явно.
+    """
+    allowed = (*FIELDS, *extra)
+    raw = request.GET.get('fields')
+    if not raw:
+        return tuple(FIELDS)
+    names = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = set(names) - set(allowed)
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(sorted(unknown))}')
+    return tuple(dict.fromkeys(names))
+
+
+def _limit(request, default=None):
+    try:
+        limit = int(
+            request.GET.get('limit', default or settings.POSTS_PER_PAGE)
+        )
+    except ValueError:
+        raise ApiError('limit должен быть числом.')
+    if not 1 <= limit <= settings.API_MAX_LIMIT:
+        raise ApiError(f'limit должен быть от 1 до {settings.API_MAX_LIMIT}.')
+    return limit
+
+
+def _select(queryset, fields):
+    """
+    Читает из БД только колонки выбранных полей и ключ сортировки,
+    а связанные таблицы присоединяет, только если они нужны.
+    """
+    columns = {'id', 'pub_date'}
+    for name in fields:
+        if name in FIELDS:
+            columns.update(FIELDS[name][0])
+    related = [name for name in ('author', 'group') if name in fields]
+    return queryset.select_related(*related).only(*columns)
+
+
+def _serialize(post, fields):
+    return {
+        name: FIELDS[name][1](post) for name in fields if name in FIELDS
+    }
+
+
+def _feed(request, queryset):
+    fields = _fields(request)
+    paginator = CursorPaginator(_select(queryset, fields), _limit(request))
+    page = paginator.page_by_cursor(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return api_response({
+        'results': [_serialize(post, fields) for post in page],
+        'next': paginator.next_cursor,
+        'previous': paginator.previous_cursor,
+    })
+
+
+@api_view
+@cache_page_versioned('global')
+def api_posts(request):
+    return _feed(request, Post.objects.all())
+
+
+@api_view
+@cache_page_versioned('group:{slug}')
+def api_group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return _feed(request, group.posts.all())
+
+
+@api_view
+@cache_page_versioned('author:{username}')
+def api_profile_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    return _feed(request, author.posts.all())
+
+
+def _comments(request, post):
+    """Страница комментариев поста по ключу (pub_date, id)."""
+    paginator = CursorPaginator(
+        post.comment.select_related('author'),
+        _limit(request, settings.COMMENTS_PER_PAGE),
+        ordering=('pub_date', 'id'),
+    )
+    page = paginator.page_by_cursor(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return {
+        'results': [
+            {
+                'id': comment.id,
+                'author': comment.author.username,
+                'text': comment.text,
+                'pub_date': comment.pub_date,
+            }
+            for comment in page
+        ],
+        'next': paginator.next_cursor,
+        'previous': paginator.previous_cursor,
+    }
+
+
+@api_view
+def api_post_detail(request, post_id):
+    """
+    Пост; с ?fields=...,comments — и первая страница комментариев,
+    следующие отдает api_post_comments по курсору next.
+    """
+    fields = _fields(request, extra=(COMMENTS_FIELD,))
+    post = get_object_or_404(_select(Post.objects, fields), id=post_id)
+    data = _serialize(post, fields)
+    if COMMENTS_FIELD in fields:
+        data[COMMENTS_FIELD] = _comments(request, post)
+    return api_response(data)
+
+
+@api_view
+def api_post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    return api_response(_comments(request, post))
@@ -0,0 +1,177 @@
+import json
+import math
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from .models import Group, Post, UserStats
+
+# Показатели, которые сравниваются с базовой линией. p99 только
+# выводится: на десятках запросов это почти максимум, он шумит.
+COMPARED = ('p50', 'p95', 'queries')
+
+
+def percentile(values, percent):
+    """Процентиль по ближайшему рангу: всегда одно из измерений."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class QueryRecorder:
+    """Считает SQL-запросы и их время через connection.execute_wrapper."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+class Scenario:
+    """Запрос к одному представлению: метод, адрес и данные формы."""
+
+    def __init__(self, name, url, method='get', data=None):
+        self.name = name
+        self.url = url
+        self.method = method
+        self.data = data or (lambda number: None)
+
+    def request(self, client, number):
+        return getattr(client, self.method)(self.url, self.data(number))
+
+
+def scenarios():
+    """
+    Сценарии на самых тяжелых объектах базы: самой большой группе,
+    самом плодовитом авторе, самом обсуждаемом посте и ленте
+    пользователя с наибольшим числом подписок.
+    """
+    group = Group.objects.order_by('-posts_count').first()
+    author = UserStats.objects.select_related('user').order_by(
+        '-posts_count'
+    ).first()
+    post = Post.objects.order_by('-comments_count').first()
+    if group is None or author is None or post is None:
+        return None
+    return [
+        Scenario('index', reverse('posts:index')),
+        Scenario(
+            'group_posts', reverse('posts:group_list', args=[group.slug])
+        ),
+        Scenario(
+            'profile', reverse('posts:profile', args=[author.user.username])
+        ),
+        Scenario(
+            'post_detail', reverse('posts:post_detail', args=[post.id])
+        ),
+        Scenario('follow_index', reverse('posts:follow_index')),
+        Scenario(
+            'post_create',
+            reverse('posts:post_create'),
+            method='post',
+            data=lambda number: {
+                'text': f'Тестовый пост {number}', 'group': group.id
+            },
+        ),
+        Scenario(
+            'add_comment',
+            reverse('posts:add_comment', args=[post.id]),
+            method='post',
+            data=lambda number: {'text': f'Комментарий {number}'},
+        ),
+    ]
+
+
+def pick_viewer():
+    """Читатель с наибольшим числом подписок — самая тяжелая лента."""
+    stats = UserStats.objects.select_related('user').order_by(
+        '-following_count'
+    ).first()
+    return stats.user if stats else None
+
+
+def run(scenario, client, requests, warmup, numbers, cold=True):
+    """
+    Прогоняет сценарий и возвращает показатели: процентили времени
+    ответа и медианы числа SQL-запросов и их времени (в мс).
+    numbers — общий счетчик для уникальных текстов в формах; при
+    cold=True перед каждым запросом очищаются все кэши.
+    """
+    durations, queries, sql_times = [], [], []
+    for iteration in range(warmup + requests):
+        if cold:
+            for alias in settings.CACHES:
+                caches[alias].clear()
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            started = time.perf_counter()
+            response = scenario.request(client, next(numbers))
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(
+                f'{scenario.name}: ответ {response.status_code}'
+            )
+        if iteration < warmup:
+            continue
+        durations.append(elapsed * 1000)
+        queries.append(recorder.queries)
+        sql_times.append(recorder.seconds * 1000)
+    return {
+        'requests': requests,
+        'p50': percentile(durations, 50),
+        'p95': percentile(durations, 95),
+        'p99': percentile(durations, 99),
+        'queries': statistics.median(queries),
+        'sql_ms': statistics.median(sql_times),
+    }
+
+
+def make_client(viewer):
+    client = Client(HTTP_HOST='localhost')
+    client.force_login(viewer)
+    return client
+
+
+def compare(results, baseline, threshold):
+    """
+    Регрессии относительно базовой линии: показатели, выросшие больше
+    чем в (1 + threshold) раз. Число запросов детерминировано, поэтому
+    для него регрессия — любой рост.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric in COMPARED:
+            allowed = previous[metric] * (
+                1 if metric == 'queries' else 1 + threshold
+            )
+            if current[metric] > allowed:
+                regressions.append(
+                    (name, metric, previous[metric], current[metric])
+                )
+    return regressions
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as source:
+        return json.load(source)
+
+
+def save_baseline(path, results):
+    with open(path, 'w', encoding='utf-8') as target:
+        json.dump(results, target, ensure_ascii=False, indent=2)
+        target.write('\n')
@@ -0,0 +1,144 @@
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.db.models import OuterRef, Subquery
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from . import page_cache
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def _version_time(version):
+    return datetime.fromtimestamp(version / 10 ** 9, tz=timezone.utc)
+
+
+def _etag(request, values, versions):
+    if request.user.is_authenticated:
+        values = (*values, request.user.pk, request.META.get('CSRF_COOKIE'))
+    return quote_etag(
+        hashlib.md5(repr((values, versions)).encode()).hexdigest()
+    )
+
+
+def conditional_page(state, *scopes):
+    """
+    Отвечает 304 на GET страницы, которая не менялась с прошлого
+    запроса клиента, не отрисовывая шаблон.
+
+    Валидаторы строятся из дешевого состояния страницы: функция
+    state(request, **kwargs) возвращает (даты, значения) или None,
+    если объекта нет. К ним добавляются версии областей кэша
+    страниц (как в cache_page_versioned) — их меняют правки и
+    удаления постов — и для вошедшего пользователя его id и токен
+    CSRF, которые попадают в разметку.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            current = state(request, **kwargs)
+            if current is None:
+                return view(request, *args, **kwargs)
+            dates, values = current
+            versions = page_cache.get_versions(
+                [page_cache.SITE_SCOPE]
+                + [scope.format(**kwargs) for scope in scopes]
+            )
+            last_modified = int(max(
+                [date for date in dates if date is not None]
+                + [_version_time(version) for version in versions]
+            ).timestamp())
+            response = get_conditional_response(
+                request,
+                etag=_etag(request, values, versions),
+                last_modified=last_modified,
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    # Отрисовка могла выдать новый токен CSRF.
+                    response['ETag'] = _etag(request, values, versions)
+                    response['Last-Modified'] = http_date(last_modified)
+                    patch_cache_control(
+                        response,
+                        no_cache=True,
+                        private=request.user.is_authenticated,
+                    )
+            return response
+        return wrapper
+    return decorator
+
+
+def is_following(request, author_id):
+    """Подписан ли читатель на автора; ответ запоминается до конца запроса."""
+    if not request.user.is_authenticated:
+        return False
+    following = request.__dict__.setdefault('_following', {})
+    if author_id not in following:
+        following[author_id] = Follow.objects.filter(
+            user=request.user, author_id=author_id
+        ).exists()
+    return following[author_id]
+
+
+def _latest(queryset):
+    """
+    Дата самой свежей записи подзапросом с LIMIT 1: он читает одну
+    строку индекса (..., pub_date), а не все записи, как MAX().
+    """
+    return Subquery(queryset.order_by('-pub_date').values('pub_date')[:1])
+
+
+def index_state(request):
+    """Последний пост сайта."""
+    last_post = Post.objects.order_by('-pub_date').values_list(
+        'pub_date', flat=True
+    ).first()
+    return [last_post], ()
+
+
+def group_state(request, slug):
+    """Последний пост группы и число ее постов."""
+    group = Group.objects.filter(slug=slug).values('posts_count').annotate(
+        last_post=_latest(Post.objects.filter(group=OuterRef('pk')))
+    ).first()
+    if group is None:
+        return None
+    return [group['last_post']], (group['posts_count'],)
+
+
+def profile_state(request, username):
+    """Последний пост автора, его счетчики и подписка читателя на него."""
+    author = User.objects.filter(username=username).values(
+        'pk',
+        'stats__posts_count',
+        'stats__followers_count',
+        'stats__following_count',
+    ).annotate(
+        last_post=_latest(Post.objects.filter(author=OuterRef('pk')))
+    ).first()
+    if author is None:
+        return None
+    following = is_following(request, author['pk'])
+    return [author.pop('last_post')], (*author.values(), following)
+
+
+def post_state(request, post_id):
+    """Правка поста, последний комментарий и число постов автора."""
+    post = Post.objects.filter(pk=post_id).values(
+        'updated', 'comments_count', 'author__stats__posts_count'
+    ).annotate(
+        last_comment=_latest(Comment.objects.filter(post=OuterRef('pk')))
+    ).first()
+    if post is None:
+        return None
+    return (
+        [post['updated'], post['last_comment']],
+        (post['comments_count'], post['author__stats__posts_count']),
+    )
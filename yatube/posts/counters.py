@@ -0,0 +1,176 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+TOTAL_POSTS_KEY = 'posts_total_count'
+
+
+def total_posts():
+    """Приблизительное число всех постов, закэшированное на время."""
+    return cache.get_or_set(
+        TOTAL_POSTS_KEY,
+        Post.objects.count,
+        settings.POSTS_COUNT_CACHE_TIMEOUT,
+    )
+
+
+def _change(queryset, field, delta):
+    """Атомарно меняет счетчик, не опуская его ниже нуля."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def _change_user(user_id, field, delta):
+    if delta > 0:
+        UserStats.objects.get_or_create(user_id=user_id)
+    _change(UserStats.objects.filter(user_id=user_id), field, delta)
+
+
+def user_stats(user):
+    """
+    Счетчики пользователя. У созданных в обход сигналов (loaddata,
+    bulk_create) строки нет: ее заводим по живым COUNT(*).
+    """
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        pass
+    stats, _ = UserStats.objects.get_or_create(user=user, defaults={
+        'posts_count': Post.objects.filter(author=user).count(),
+        'followers_count': Follow.objects.filter(author=user).count(),
+        'following_count': Follow.objects.filter(user=user).count(),
+    })
+    user.stats = stats
+    return stats
+
+
+def post_added(post, delta=1):
+    with transaction.atomic():
+        _change_user(post.author_id, 'posts_count', delta)
+        if post.group_id is not None:
+            _change(
+                Group.objects.filter(id=post.group_id), 'posts_count', delta
+            )
+
+
+def post_moved(old_group_id, new_group_id):
+    """Переносит пост из одной группы в другую при редактировании."""
+    if old_group_id == new_group_id:
+        return
+    with transaction.atomic():
+        if old_group_id is not None:
+            _change(Group.objects.filter(id=old_group_id), 'posts_count', -1)
+        if new_group_id is not None:
+            _change(Group.objects.filter(id=new_group_id), 'posts_count', 1)
+
+
+def comment_added(comment, delta=1):
+    _change(
+        Post.objects.filter(id=comment.post_id), 'comments_count', delta
+    )
+
+
+def follow_added(follow, delta=1):
+    with transaction.atomic():
+        _change_user(follow.author_id, 'followers_count', delta)
+        _change_user(follow.user_id, 'following_count', delta)
+
+
+def _batches(queryset, batch_size, ids=None):
+    """
+    Идентификаторы объектов пачками по возрастанию pk, без OFFSET.
+    С ids — только существующие объекты из этого набора.
+    """
+    if ids is not None:
+        ids = sorted(ids)
+        for start in range(0, len(ids), batch_size):
+            batch = list(
+                queryset.filter(pk__in=ids[start:start + batch_size])
+                .order_by('pk')
+                .values_list('pk', flat=True)
+            )
+            if batch:
+                yield batch
+        return
+    last_pk = 0
+    while True:
+        batch = list(
+            queryset.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1]
+
+
+def _counts(queryset, key):
+    return dict(
+        queryset.order_by().values(key).annotate(
+            total=Count('pk')
+        ).values_list(key, 'total')
+    )
+
+
+def rebuild_user_stats(batch_size, ids=None):
+    """
+    Пересчитывает счетчики пользователей (с ids — только этих);
+    отдает размер пачек.
+    """
+    for batch in _batches(User.objects.all(), batch_size, ids):
+        with transaction.atomic():
+            UserStats.objects.bulk_create(
+                [UserStats(user_id=pk) for pk in batch],
+                ignore_conflicts=True,
+            )
+            posts = _counts(
+                Post.objects.filter(author_id__in=batch), 'author'
+            )
+            followers = _counts(
+                Follow.objects.filter(author_id__in=batch), 'author'
+            )
+            following = _counts(
+                Follow.objects.filter(user_id__in=batch), 'user'
+            )
+            stats = list(UserStats.objects.filter(user_id__in=batch))
+            for item in stats:
+                item.posts_count = posts.get(item.user_id, 0)
+                item.followers_count = followers.get(item.user_id, 0)
+                item.following_count = following.get(item.user_id, 0)
+            UserStats.objects.bulk_update(
+                stats,
+                ['posts_count', 'followers_count', 'following_count'],
+            )
+        yield len(batch)
+
+
+def rebuild_group_counters(batch_size, ids=None):
+    for batch in _batches(Group.objects.all(), batch_size, ids):
+        with transaction.atomic():
+            posts = _counts(Post.objects.filter(group_id__in=batch), 'group')
+            groups = list(Group.objects.filter(id__in=batch))
+            for group in groups:
+                group.posts_count = posts.get(group.id, 0)
+            Group.objects.bulk_update(groups, ['posts_count'])
+        yield len(batch)
+
+
+def rebuild_post_counters(batch_size, ids=None):
+    for batch in _batches(Post.objects.all(), batch_size, ids):
+        with transaction.atomic():
+            comments = _counts(
+                Comment.objects.filter(post_id__in=batch), 'post'
+            )
+            posts = list(Post.objects.filter(id__in=batch).only('id'))
+            for post in posts:
+                post.comments_count = comments.get(post.id, 0)
+            Post.objects.bulk_update(posts, ['comments_count'])
+        yield len(batch)
@@ -0,0 +1,285 @@
+import io
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from PIL import Image, ImageDraw
+
+from .importer import Importer
+from .models import Follow, Group, Post
+from .timeline import fill_for_posts
+
+User = get_user_model()
+
+# Показатели степенных распределений: чем больше, тем сильнее перекос
+# в пользу первых по рангу авторов и групп.
+AUTHOR_SKEW = 0.8
+FOLLOW_SKEW = 1.1
+GROUP_SKEW = 1.2
+# Хвост числа комментариев (распределение Парето) и характерная
+# задержка комментария после публикации поста, в секундах.
+COMMENT_TAIL = 1.5
+COMMENT_DELAY = 60 * 60
+MAX_COMMENTS_PER_POST = 10000
+# Посты самых популярных авторов (первый процент по рангу)
+# комментируют во столько раз активнее.
+POPULAR_AUTHORS_SHARE = 0.01
+POPULAR_COMMENTS_BOOST = 10
+NO_GROUP_SHARE = 0.3
+TEXT_POOL_SIZE = 500
+IMAGE_POOL_SIZE = 20
+
+
+def parse_count(value):
+    """Число с необязательным суффиксом: 500, 100k, 10M."""
+    multipliers = {'k': 10 ** 3, 'm': 10 ** 6}
+    value = str(value).strip().lower()
+    if value and value[-1] in multipliers:
+        return int(float(value[:-1]) * multipliers[value[-1]])
+    return int(value)
+
+
+def _cumulative_weights(size, skew):
+    """Накопленные веса закона Ципфа: у ранга k вес 1 / k ** skew."""
+    return list(accumulate(1 / rank ** skew for rank in range(1, size + 1)))
+
+
+class DatasetGenerator:
+    """
+    Набор данных заданного масштаба с правдоподобными перекосами.
+
+    Число постов у авторов и подписчиков у них, а также размеры
+    групп распределены по степенному закону, число комментариев к
+    посту — с тяжелым хвостом, и комментарии приходят всплеском
+    вскоре после публикации. Часть постов получает картинку из
+    небольшого набора, который хранилище сохранит по одному разу.
+
+    Пользователи, группы и подписки сохраняются bulk_create, посты
+    и комментарии — через Importer, который сохраняет даты. Ленты
+    подписчиков заполняются после всех постов одним INSERT ... SELECT
+    из подписок. Каждый шаг отдает размеры пачек.
+    """
+
+    def __init__(self, posts, users=None, groups=None, follows_per_user=10,
+                 comments_per_post=2, image_share=0.1, days=365, seed=0,
+                 batch_size=5000, prefix='user'):
+        self.posts = posts
+        self.users = users or max(10, posts // 10)
+        self.groups = groups or max(3, self.users // 100)
+        self.follows_per_user = follows_per_user
+        self.comments_per_post = comments_per_post
+        self.image_share = image_share
+        self.days = days
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.random = random.Random(seed)
+        self.faker = Faker('ru_RU')
+        self.faker.seed_instance(seed)
+        self.importer = Importer(fan_out=False)
+        self.post_ids = None
+        self.usernames = [f'{prefix}{number}' for number in range(self.users)]
+        self.slugs = [f'{prefix}-group-{number}' for number in range(
+            self.groups
+        )]
+        self.comments_created = 0
+
+    def _batched(self, items):
+        for start in range(0, len(items), self.batch_size):
+            yield items[start:start + self.batch_size]
+
+    def create_users(self):
+        password = make_password(None)
+        for usernames in self._batched(self.usernames):
+            User.objects.bulk_create(
+                [
+                    User(
+                        username=username,
+                        first_name=self.faker.first_name(),
+                        last_name=self.faker.last_name(),
+                        password=password,
+                    )
+                    for username in usernames
+                ],
+                ignore_conflicts=True,
+            )
+            self.importer.users.update(
+                User.objects.filter(
+                    username__in=usernames
+                ).values_list('username', 'id')
+            )
+            yield len(usernames)
+
+    def create_groups(self):
+        Group.objects.bulk_create(
+            [
+                Group(
+                    slug=slug,
+                    title=self.faker.catch_phrase()[:200],
+                    description=self.faker.paragraph(),
+                )
+                for slug in self.slugs
+            ],
+            ignore_conflicts=True,
+        )
+        self.importer.groups.update(
+            Group.objects.filter(slug__in=self.slugs).values_list('slug', 'id')
+        )
+        yield len(self.slugs)
+
+    def create_follows(self):
+        """
+        Подписки с числом подписчиков по степенному закону: автора
+        выбирают с весом его ранга, так что у первых авторов
+        подписчиков на порядки больше, чем у остальных.
+        """
+        ids = [self.importer.users[username] for username in self.usernames]
+        weights = _cumulative_weights(len(ids), FOLLOW_SKEW)
+        follows = []
+        for user_id in ids:
+            count = min(
+                len(ids) - 1,
+                round(self.random.expovariate(1 / self.follows_per_user)),
+            )
+            authors = set(
+                self.random.choices(ids, cum_weights=weights, k=count)
+            )
+            authors.discard(user_id)
+            follows.extend(
+                Follow(user_id=user_id, author_id=author_id)
+                for author_id in authors
+            )
+            if len(follows) >= self.batch_size:
+                Follow.objects.bulk_create(follows, ignore_conflicts=True)
+                yield len(follows)
+                follows = []
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+        yield len(follows)
+
+    def create_posts(self):
+        """Посты пачками, а за каждой пачкой — комментарии к ней."""
+        texts = [
+            self.faker.paragraph(nb_sentences=self.random.randint(1, 8))
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+        images = self._images()
+        # Ранги авторов по числу постов не совпадают с рангами по
+        # числу подписчиков: иначе самый читаемый автор был бы и самым
+        # плодовитым, и ленты подписок росли бы квадратично.
+        authors_by_rank = self.random.sample(self.usernames, self.users)
+        author_weights = _cumulative_weights(self.users, AUTHOR_SKEW)
+        group_weights = _cumulative_weights(self.groups, GROUP_SKEW)
+        now = timezone.now()
+        next_id = (Post.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+        self.post_ids = (next_id, next_id + self.posts - 1)
+        for start in range(0, self.posts, self.batch_size):
+            size = min(self.batch_size, self.posts - start)
+            authors = self.random.choices(
+                authors_by_rank, cum_weights=author_weights, k=size
+            )
+            groups = self.random.choices(
+                self.slugs, cum_weights=group_weights, k=size
+            )
+            records = []
+            for number, (author, group) in enumerate(zip(authors, groups)):
+                has_image = self.random.random() < self.image_share
+                records.append({
+                    'id': next_id + start + number,
+                    'author': author,
+                    'group': (
+                        group if self.random.random() >= NO_GROUP_SHARE
+                        else None
+                    ),
+                    'text': self.random.choice(texts),
+                    'image': (
+                        self.random.choice(images) if images and has_image
+                        else ''
+                    ),
+                    'pub_date': now - timedelta(
+                        seconds=self.random.uniform(0, self.days * 86400)
+                    ),
+                })
+            self.importer.import_batch('posts', records)
+            self._create_comments(records, texts, now)
+            yield size
+
+    def create_timelines(self):
+        """Ленты подписчиков для всех созданных постов."""
+        if self.post_ids is not None:
+            yield fill_for_posts(*self.post_ids)
+
+    def _create_comments(self, posts, texts, now):
+        """
+        Комментарии к пачке постов: их число с тяжелым хвостом
+        (у немногих постов — тысячи, чаще у популярных авторов), а
+        время — всплеск вскоре после публикации поста.
+        """
+        # Среднее значение paretovariate(a) - 1 равно 1 / (a - 1).
+        scale = self.comments_per_post * (COMMENT_TAIL - 1)
+        popular = set(
+            self.usernames[:max(1, int(self.users * POPULAR_AUTHORS_SHARE))]
+        )
+        records = []
+        for post in posts:
+            boost = POPULAR_COMMENTS_BOOST if post['author'] in popular else 1
+            count = min(
+                MAX_COMMENTS_PER_POST,
+                int(
+                    boost * scale
+                    * (self.random.paretovariate(COMMENT_TAIL) - 1)
+                ),
+            )
+            for _ in range(count):
+                delay = self.random.expovariate(1 / COMMENT_DELAY)
+                records.append({
+                    'post': post['id'],
+                    'author': self.random.choice(self.usernames),
+                    'text': self.random.choice(texts)[:300],
+                    'pub_date': min(
+                        now, post['pub_date'] + timedelta(seconds=delay)
+                    ),
+                })
+                if len(records) >= self.batch_size:
+                    self.comments_created += self.importer.import_batch(
+                        'comments', records
+                    )
+                    records = []
+        if records:
+            self.comments_created += self.importer.import_batch(
+                'comments', records
+            )
+
+    def _images(self):
+        """Несколько картинок в хранилище поля Post.image; их имена."""
+        if not self.image_share:
+            return []
+        storage = Post._meta.get_field('image').storage
+        names = []
+        for _ in range(IMAGE_POOL_SIZE):
+            image = Image.new(
+                'RGB',
+                (self.random.randint(640, 1600),
+                 self.random.randint(480, 1200)),
+                tuple(self.random.randrange(256) for _ in range(3)),
+            )
+            draw = ImageDraw.Draw(image)
+            for _ in range(5):
+                x = self.random.randrange(image.width)
+                y = self.random.randrange(image.height)
+                draw.ellipse(
+                    (x, y, x + image.width // 4, y + image.height // 4),
+                    fill=tuple(self.random.randrange(256) for _ in range(3)),
+                )
+            content = io.BytesIO()
+            image.save(content, format='JPEG', quality=85)
+            names.append(
+                storage.save('posts/dataset.jpg', ContentFile(
+                    content.getvalue()
+                ))
+            )
+        return names
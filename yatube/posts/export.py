@@ -0,0 +1,76 @@
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+# Поля выгрузки совпадают с полями, которые принимает import_content.
+FIELDS = ('id', 'author', 'group', 'group_title', 'text', 'pub_date')
+LOOKUPS = (
+    'id', 'author__username', 'group__slug', 'group__title', 'text',
+    'pub_date',
+)
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+class Echo:
+    """Буфер для csv.writer, который просто возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def _rows(queryset):
+    """
+    Строки постов из БД кусками по EXPORT_CHUNK_SIZE: iterator()
+    не кэширует весь queryset и читает его серверным курсором там,
+    где БД это умеет.
+    """
+    rows = queryset.order_by().values_list(*LOOKUPS).iterator(
+        chunk_size=settings.EXPORT_CHUNK_SIZE
+    )
+    for row in rows:
+        row = dict(zip(FIELDS, row))
+        row['pub_date'] = row['pub_date'].isoformat()
+        yield row
+
+
+def jsonl_lines(queryset):
+    for row in _rows(queryset):
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def csv_lines(queryset):
+    writer = csv.DictWriter(Echo(), FIELDS)
+    yield writer.writeheader()
+    for row in _rows(queryset):
+        yield writer.writerow(row)
+
+
+def _joined(lines, size):
+    """Склеивает строки по size, чтобы не отдавать серверу по строчке."""
+    while True:
+        chunk = ''.join(islice(lines, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def export_response(queryset, file_format, filename):
+    """
+    Потоковая выгрузка постов в JSON Lines или CSV. Ответ собирается
+    по мере чтения из БД, так что память не зависит от числа постов.
+    """
+    lines = (csv_lines if file_format == 'csv' else jsonl_lines)(queryset)
+    response = StreamingHttpResponse(
+        _joined(lines, settings.EXPORT_CHUNK_SIZE),
+        content_type=CONTENT_TYPES[file_format],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{filename}.{file_format}"'
+    )
+    return response
@@ -0,0 +1,127 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from .conditional import (conditional_page, group_state, index_state,
+                          profile_state)
+from .models import Group, Post
+from .page_cache import cache_page_versioned
+
+User = get_user_model()
+
+
+class PostsFeed(Feed):
+    """Последние посты сайта в RSS."""
+    title = 'Yatube: последние записи'
+    description = 'Новые записи всех авторов'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj):
+        # Тот же порядок, что у лент, — чтение по индексу (..., pub_date, id).
+        return self.posts(obj).select_related('author', 'group').order_by(
+            '-pub_date', '-id'
+        )[:settings.FEED_ITEMS]
+
+    def item_title(self, post):
+        return Truncator(post.text).words(settings.FEED_TITLE_WORDS)
+
+    def item_description(self, post):
+        return post.text
+
+    def item_link(self, post):
+        return reverse('posts:post_detail', args=[post.id])
+
+    def item_author_name(self, post):
+        return post.author.get_full_name() or post.author.username
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_updateddate(self, post):
+        return post.updated
+
+    def item_categories(self, post):
+        return [post.group.title] if post.group else []
+
+
+class GroupPostsFeed(PostsFeed):
+    """Последние посты группы в RSS."""
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_list', args=[group.slug])
+
+    def posts(self, group):
+        return group.posts.all()
+
+
+class ProfilePostsFeed(PostsFeed):
+    """Последние посты автора в RSS."""
+
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f'Yatube: {author.get_full_name() or author.username}'
+
+    def description(self, author):
+        return f'Записи пользователя {author.username}'
+
+    def link(self, author):
+        return reverse('posts:profile', args=[author.username])
+
+    def posts(self, author):
+        return author.posts.all()
+
+
+def atom(feed_class):
+    """Тот же канал в формате Atom."""
+    return type(
+        f'{feed_class.__name__}Atom',
+        (feed_class,),
+        {'feed_type': Atom1Feed, 'subtitle': feed_class.description},
+    )
+
+
+def feed_view(feed_class, state, scope):
+    """
+    Представление канала: ответ кэшируется вместе с HTML-страницей
+    той же области и сбрасывается теми же записями постов, а
+    If-Modified-Since и If-None-Match сверяются до обращения к кэшу.
+    """
+    feed = feed_class()
+
+    def view(request, **kwargs):
+        return feed(request, **kwargs)
+
+    view.__name__ = view.__qualname__ = feed_class.__name__
+    return conditional_page(state, scope)(cache_page_versioned(scope)(view))
+
+
+posts_rss = feed_view(PostsFeed, index_state, 'global')
+posts_atom = feed_view(atom(PostsFeed), index_state, 'global')
+group_rss = feed_view(GroupPostsFeed, group_state, 'group:{slug}')
+group_atom = feed_view(atom(GroupPostsFeed), group_state, 'group:{slug}')
+profile_rss = feed_view(
+    ProfilePostsFeed, profile_state, 'author:{username}'
+)
+profile_atom = feed_view(
+    atom(ProfilePostsFeed), profile_state, 'author:{username}'
+)
@@ -1,6 +1,10 @@
 from django import forms
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
 
+from . import thumbnails
 from .models import Comment, Post
+from .uploads import normalize_image
 
 
 class PostForm(forms.ModelForm):
@@ -12,6 +16,14 @@ class PostForm(forms.ModelForm):
         self.fields['group'].empty_label = (
             'Здесь можно выбрать группу по интересам 🦸🏻‍♂️👩🏼‍🌾👨🏻‍🎨'
         )
+        # Обрезанный обработчиком загрузки файл не отдаем полю:
+        # он не читается как картинка, а ошибка нужна точная.
+        self.image_too_large = getattr(
+            self.files.get('image'), 'truncated', False
+        )
+        if self.image_too_large:
+            self.files = self.files.copy()
+            del self.files['image']
 
     class Meta:
         model = Post
@@ -27,6 +39,22 @@ class PostForm(forms.ModelForm):
             'image': 'Загрузить картинку к посту'
         }
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if self.image_too_large:
+            raise ValidationError(
+                'Файл слишком большой.', code='file_too_large'
+            )
+        if isinstance(image, UploadedFile):
+            return normalize_image(image)
+        return image
+
+    def save(self, commit=True):
+        post = super().save(commit)
+        if commit and post.image and 'image' in self.changed_data:
+            thumbnails.schedule(post.image.name)
+        return post
+
 
 class CommentForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
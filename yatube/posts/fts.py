@@ -0,0 +1,90 @@
+from django.db import connections
+
+FTS_TABLE = 'posts_post_fts'
+TRIGGERS = (
+    'posts_post_fts_insert',
+    'posts_post_fts_delete',
+    'posts_post_fts_update',
+)
+
+# Индекс хранит только ссылки на строки posts_post (external content),
+# а триггеры поддерживают его при создании, правке и удалении постов.
+INSTALL_SQL = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        text,
+        content='posts_post',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert
+    AFTER INSERT ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete
+    AFTER DELETE ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS posts_post_fts_update
+    AFTER UPDATE OF text ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+)
+
+UNINSTALL_SQL = tuple(
+    f'DROP TRIGGER IF EXISTS {trigger}' for trigger in TRIGGERS
+) + (f'DROP TABLE IF EXISTS {FTS_TABLE}',)
+
+
+def install(connection, rebuild=False):
+    """
+    Создает индекс и триггеры, если их нет.
+
+    Пересоздание таблицы posts_post при миграции удаляет и триггеры:
+    если какого-то не хватало, индекс мог отстать и перестраивается.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+            "AND tbl_name = 'posts_post'"
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        for statement in INSTALL_SQL:
+            cursor.execute(statement)
+        if rebuild or not existing.issuperset(TRIGGERS):
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+            )
+
+
+def uninstall(connection):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in UNINSTALL_SQL:
+            cursor.execute(statement)
+
+
+def repair(sender, using, **kwargs):
+    """
+    После migrate восстанавливает триггеры, если индекс уже создан
+    миграцией, а таблица posts_post с тех пор пересоздавалась.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    if FTS_TABLE in connection.introspection.table_names():
+        install(connection)
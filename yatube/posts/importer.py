@@ -0,0 +1,306 @@
+import csv
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters, page_cache
+from .models import Comment, Follow, Group, Post, TimelineEntry
+from .timeline import backfill_many
+
+User = get_user_model()
+
+FORMATS = ('jsonl', 'csv')
+
+
+def read_records(path, file_format=None):
+    """
+    Построчно читает записи из JSON Lines или CSV (с заголовком),
+    не загружая файл в память. Формат по умолчанию — по расширению.
+    """
+    file_format = file_format or os.path.splitext(path)[1].lstrip('.')
+    if file_format not in FORMATS:
+        raise ValueError(f'Неизвестный формат файла: {file_format}')
+    with open(path, encoding='utf-8', newline='') as source:
+        if file_format == 'csv':
+            yield from csv.DictReader(source)
+            return
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+
+
+def batches(records, batch_size, skip=0):
+    """Пачки записей, начиная с записи номер skip."""
+    records = islice(records, skip, None)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _date(value):
+    """Дата из записи; без часового пояса считается текущим поясом."""
+    if not value:
+        return timezone.now()
+    date = value if isinstance(value, datetime) else parse_datetime(value)
+    if date is None:
+        raise ValueError(f'Неверная дата: {value}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def _id(record):
+    return int(record['id']) if record.get('id') else None
+
+
+@contextmanager
+def _explicit_dates(model, names):
+    """
+    Отключает auto_now и auto_now_add у полей модели, чтобы вставка
+    сохранила даты из записей без второго прохода bulk_update.
+    Флаги общие для процесса, поэтому это годится только для
+    команд загрузки, а не для кода, который работает в запросах.
+    """
+    fields = [model._meta.get_field(name) for name in names]
+    flags = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def refresh_derived(batch_size=1000, users=None, groups=None, posts=None):
+    """
+    Пересчитывает то, что массовая загрузка обходит стороной:
+    денормализованные счетчики, число всех постов и кэш страниц.
+    Счетчики пересчитываются только у переданных id пользователей,
+    групп и постов (Importer.touched), а без них — у всех.
+    """
+    for rebuild, ids in (
+        (counters.rebuild_user_stats, users),
+        (counters.rebuild_group_counters, groups),
+        (counters.rebuild_post_counters, posts),
+    ):
+        for _ in rebuild(batch_size, ids):
+            pass
+    cache.delete(counters.TOTAL_POSTS_KEY)
+    page_cache.bump(page_cache.SITE_SCOPE)
+
+
+class Importer:
+    """
+    Массовая загрузка постов, комментариев и подписок.
+
+    Каждая пачка сохраняется bulk_create в своей транзакции. Авторы
+    и группы ищутся по карте в памяти, недостающие создаются пачкой.
+    Явные id постов и комментариев сохраняются, а запись с уже
+    существующим id пропускается, как и уже существующая подписка.
+    Записи без id так не распознать: повторную загрузку пачки
+    исключает точка сохранения команды в той же транзакции.
+    Комментарии к отсутствующим постам тоже пропускаются. Сигналы
+    моделей при этом не работают: счетчики и кэш страниц обновляет
+    вызывающий код, ленты — сам импорт (при fan_out=False — тоже
+    вызывающий код, например timeline.fill_for_posts). Id объектов,
+    чьи счетчики изменила загрузка, собираются в touched — их можно
+    передать в refresh_derived.
+    """
+
+    def __init__(self, fan_out=True):
+        self.users = {}
+        self.groups = {}
+        self.fan_out = fan_out
+        self.touched = {'users': set(), 'groups': set(), 'posts': set()}
+
+    def import_batch(self, kind, records):
+        with transaction.atomic():
+            return getattr(self, f'_import_{kind}')(records)
+
+    def _user_ids(self, usernames):
+        missing = set(usernames) - self.users.keys()
+        if missing:
+            self.users.update(
+                User.objects.filter(
+                    username__in=missing
+                ).values_list('username', 'id')
+            )
+        new = missing - self.users.keys()
+        if new:
+            users = [User(username=username) for username in new]
+            for user in users:
+                user.set_unusable_password()
+            User.objects.bulk_create(users, ignore_conflicts=True)
+            self.users.update(
+                User.objects.filter(
+                    username__in=new
+                ).values_list('username', 'id')
+            )
+        return self.users
+
+    def _group_ids(self, records):
+        titles = {
+            record['group']: record.get('group_title') or record['group']
+            for record in records if record.get('group')
+        }
+        missing = titles.keys() - self.groups.keys()
+        if missing:
+            self.groups.update(
+                Group.objects.filter(
+                    slug__in=missing
+                ).values_list('slug', 'id')
+            )
+        new = missing - self.groups.keys()
+        if new:
+            Group.objects.bulk_create(
+                [Group(slug=slug, title=titles[slug]) for slug in new],
+                ignore_conflicts=True,
+            )
+            self.groups.update(
+                Group.objects.filter(slug__in=new).values_list('slug', 'id')
+            )
+        return self.groups
+
+    def _import_posts(self, records):
+        users = self._user_ids(record['author'] for record in records)
+        groups = self._group_ids(records)
+        posts = []
+        for record in records:
+            pub_date = _date(record.get('pub_date'))
+            posts.append(Post(
+                id=_id(record),
+                author_id=users[record['author']],
+                group_id=groups.get(record.get('group')),
+                text=record['text'],
+                image=record.get('image') or '',
+                pub_date=pub_date,
+                updated=pub_date,
+            ))
+        posts = self._insert_new(Post, posts, ['pub_date', 'updated'])
+        self.touched['users'].update(post.author_id for post in posts)
+        self.touched['groups'].update(
+            post.group_id for post in posts if post.group_id is not None
+        )
+        if self.fan_out:
+            self._fan_out(posts)
+        return len(posts)
+
+    def _import_comments(self, records):
+        users = self._user_ids(record['author'] for record in records)
+        posts = set(
+            Post.objects.filter(
+                id__in=[int(record['post']) for record in records]
+            ).values_list('id', flat=True)
+        )
+        comments = [
+            Comment(
+                id=_id(record),
+                post_id=int(record['post']),
+                author_id=users[record['author']],
+                text=record['text'],
+                pub_date=_date(record.get('pub_date')),
+            )
+            for record in records
+            if int(record['post']) in posts
+        ]
+        comments = self._insert_new(Comment, comments, ['pub_date'])
+        self.touched['posts'].update(
+            comment.post_id for comment in comments
+        )
+        return len(comments)
+
+    def _import_follows(self, records):
+        users = self._user_ids(
+            username
+            for record in records
+            for username in (record['user'], record['author'])
+        )
+        pairs = {
+            (users[record['user']], users[record['author']])
+            for record in records
+            if record['user'] != record['author']
+        }
+        existing = set(
+            Follow.objects.filter(
+                user_id__in={user_id for user_id, _ in pairs},
+                author_id__in={author_id for _, author_id in pairs},
+            ).values_list('user_id', 'author_id')
+        )
+        new = pairs - existing
+        Follow.objects.bulk_create(
+            [
+                Follow(user_id=user_id, author_id=author_id)
+                for user_id, author_id in new
+            ],
+            ignore_conflicts=True,
+        )
+        self.touched['users'].update(
+            user_id for pair in new for user_id in pair
+        )
+        backfill_many(new)
+        return len(new)
+
+    @staticmethod
+    def _insert_new(model, objects, date_fields):
+        """
+        Вставляет объекты, которых еще нет в базе, и возвращает их.
+
+        Объекты без id получают id после текущего максимума. Даты из
+        записей сохраняются как есть: auto_now_add и auto_now на время
+        вставки отключаются.
+        """
+        ids = [obj.pk for obj in objects if obj.pk is not None]
+        seen = set(
+            model.objects.filter(pk__in=ids).values_list('pk', flat=True)
+        )
+        new_objects = []
+        for obj in objects:
+            if obj.pk is None or obj.pk not in seen:
+                seen.add(obj.pk)
+                new_objects.append(obj)
+        objects = new_objects
+        last_id = max(
+            [model.objects.aggregate(last=Max('pk'))['last'] or 0] + ids
+        )
+        for obj in objects:
+            if obj.pk is None:
+                last_id += 1
+                obj.pk = last_id
+        with _explicit_dates(model, date_fields):
+            model.objects.bulk_create(objects)
+        return objects
+
+    @staticmethod
+    def _fan_out(posts):
+        """Добавляет пачку постов в ленты подписчиков их авторов."""
+        authors = {post.author_id for post in posts}
+        followers = {}
+        for user_id, author_id in Follow.objects.filter(
+            author_id__in=authors
+        ).values_list('user_id', 'author_id'):
+            followers.setdefault(author_id, []).append(user_id)
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(
+                    user_id=user_id,
+                    post_id=post.pk,
+                    author_id=post.author_id,
+                    pub_date=post.pub_date,
+                )
+                for post in posts
+                for user_id in followers.get(post.author_id, ())
+            ],
+            ignore_conflicts=True,
+        )
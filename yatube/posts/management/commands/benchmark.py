@@ -0,0 +1,142 @@
+import os
+from itertools import count
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет представления ленты, поста и форм тестовым клиентом: '
+        'p50/p95/p99 времени ответа, число SQL-запросов и их время. '
+        'Сохраняет базовую линию в JSON и сравнивает с ней следующие '
+        'прогоны. Все изменения в базе откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Число замеренных запросов к каждому представлению.',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=5,
+            help='Число незамеренных запросов перед замером.',
+        )
+        parser.add_argument(
+            '--views', nargs='+', metavar='VIEW',
+            help='Только эти представления (по умолчанию все).',
+        )
+        parser.add_argument(
+            '--warm-cache', action='store_true',
+            help='Не очищать кэши перед каждым запросом.',
+        )
+        parser.add_argument(
+            '--seed-posts',
+            help=(
+                'Сначала создать набор данных generate_dataset с таким '
+                'числом постов (откатывается вместе с прогоном).'
+            ),
+        )
+        parser.add_argument(
+            '--baseline',
+            help=(
+                'Файл базовой линии; по умолчанию benchmark.json рядом с '
+                'manage.py. Указанного явно файла не может не быть.'
+            ),
+        )
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Записать результаты как новую базовую линию.',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый рост времени ответа, доля (0.2 — на 20%%).',
+        )
+
+    def handle(self, *args, **options):
+        baseline = options['baseline'] or os.path.join(
+            settings.BASE_DIR, 'benchmark.json'
+        )
+        if not options['save_baseline'] and not os.path.exists(baseline):
+            # Опечатка в пути для проверки в CI не должна давать успех.
+            if options['baseline']:
+                raise CommandError(f'Нет базовой линии {baseline}.')
+            self.stderr.write(self.style.WARNING(
+                f'Нет базовой линии {baseline}: сравнения не будет. '
+                'Сохраните ее с --save-baseline.'
+            ))
+        with override_settings(DEBUG=False), transaction.atomic():
+            results = self.measure(options)
+            transaction.set_rollback(True)
+        if options['save_baseline']:
+            benchmark.save_baseline(baseline, results)
+            self.stdout.write(self.style.SUCCESS(
+                f'Базовая линия сохранена в {baseline}.'
+            ))
+            return
+        if not os.path.exists(baseline):
+            return
+        regressions = benchmark.compare(
+            results, benchmark.load_baseline(baseline), options['threshold']
+        )
+        for name, metric, previous, current in regressions:
+            self.stdout.write(self.style.ERROR(
+                f'{name}: {metric} {previous:.1f} -> {current:.1f}'
+            ))
+        if regressions:
+            raise CommandError(
+                f'Регрессии относительно {baseline}: '
+                f'{len(regressions)}.'
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
+
+    def measure(self, options):
+        if options['seed_posts']:
+            call_command(
+                'generate_dataset',
+                f'--posts={options["seed_posts"]}',
+                '--prefix=benchmark',
+                # Файлы картинок не откатываются вместе с базой.
+                '--image-share=0',
+                stdout=self.stdout,
+            )
+        viewer = benchmark.pick_viewer()
+        scenarios = benchmark.scenarios()
+        if viewer is None or scenarios is None:
+            raise CommandError(
+                'В базе нет данных: запустите generate_dataset '
+                'или передайте --seed-posts.'
+            )
+        if options['views']:
+            scenarios = [
+                scenario for scenario in scenarios
+                if scenario.name in options['views']
+            ]
+        client = benchmark.make_client(viewer)
+        numbers = count()
+        results = {}
+        self.stdout.write(
+            f'{"view":<14}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"queries":>9}{"sql_ms":>9}'
+        )
+        for scenario in scenarios:
+            result = benchmark.run(
+                scenario,
+                client,
+                options['requests'],
+                options['warmup'],
+                numbers,
+                cold=not options['warm_cache'],
+            )
+            results[scenario.name] = result
+            self.stdout.write(
+                f'{scenario.name:<14}{result["p50"]:>9.1f}'
+                f'{result["p95"]:>9.1f}{result["p99"]:>9.1f}'
+                f'{result["queries"]:>9g}{result["sql_ms"]:>9.1f}'
+            )
+        return results
@@ -0,0 +1,126 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+
+NEXT_CURSOR = re.compile(r'\?after=([\w=-]+)')
+FULL_SCAN = re.compile(r'\bSCAN (TABLE )?\w+$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет EXPLAIN QUERY PLAN для запросов страниц с лентами '
+        'и сообщает о полных сканированиях таблиц и сортировках '
+        'во временном B-дереве.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--strict',
+            action='store_true',
+            help='Завершиться с ошибкой, если найдены проблемные планы.',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(
+                'EXPLAIN QUERY PLAN поддерживается только для SQLite.'
+            )
+        problems = 0
+        # Закэшированная страница не выполнит ни одного запроса.
+        with override_settings(PAGE_CACHE_ENABLED=False), \
+                transaction.atomic():
+            for name, url, user in self.get_pages():
+                problems += self.explain_page(name, url, user)
+            transaction.set_rollback(True)
+        if problems:
+            message = f'Найдено проблемных запросов: {problems}'
+            if options['strict']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                'Все запросы лент используют индексы.'
+            ))
+
+    def get_pages(self):
+        """Страницы с лентами для произвольных объектов из базы."""
+        pages = [('posts:index', reverse('posts:index'), None)]
+        group = Group.objects.filter(posts__isnull=False).first()
+        if group is not None:
+            pages.append((
+                'posts:group_list',
+                reverse('posts:group_list', kwargs={'slug': group.slug}),
+                None,
+            ))
+        post = Post.objects.select_related('author').first()
+        if post is not None:
+            pages.append((
+                'posts:profile',
+                reverse(
+                    'posts:profile',
+                    kwargs={'username': post.author.username}
+                ),
+                None,
+            ))
+            pages.append((
+                'posts:post_detail',
+                reverse('posts:post_detail', kwargs={'post_id': post.id}),
+                None,
+            ))
+        follow = Follow.objects.select_related('user').first()
+        if follow is not None:
+            pages.append((
+                'posts:follow_index',
+                reverse('posts:follow_index'),
+                follow.user,
+            ))
+        return pages
+
+    def explain_page(self, name, url, user):
+        """Проверяет первую и вторую страницу ленты."""
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        problems = 0
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url)
+            if response.status_code != 200:
+                # Планы страницы ошибки ничего не говорят о ленте.
+                raise CommandError(
+                    f'{name} {url}: ответ {response.status_code}'
+                )
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{name} {url}'))
+            for query in context.captured_queries:
+                problems += self.explain_query(query['sql'])
+            match = NEXT_CURSOR.search(response.content.decode())
+            url = (
+                f'{url.split("?")[0]}?after={match.group(1)}'
+                if match and '?' not in url else None
+            )
+        return problems
+
+    def explain_query(self, sql):
+        if not sql.lstrip().upper().startswith('SELECT'):
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = [row[-1] for row in cursor.fetchall()]
+        issues = [
+            step for step in plan
+            if FULL_SCAN.search(step) or TEMP_SORT in step
+        ]
+        self.stdout.write(f'  {sql}')
+        for step in plan:
+            line = f'    {step}'
+            if step in issues:
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+        return bool(issues)
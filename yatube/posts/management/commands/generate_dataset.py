@@ -0,0 +1,94 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.dataset import DatasetGenerator, parse_count
+from posts.importer import refresh_derived
+
+
+class Command(BaseCommand):
+    help = (
+        'Создает набор данных заданного масштаба (1k, 100k, 10M постов) '
+        'с перекосами, как на рабочем сайте: популярными авторами, '
+        'большими группами и всплесками комментариев.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=parse_count, default=1000,
+            help='Число постов; можно с суффиксом: 100k, 10M.',
+        )
+        parser.add_argument(
+            '--users', type=parse_count,
+            help='Число пользователей; по умолчанию — десятая часть постов.',
+        )
+        parser.add_argument(
+            '--groups', type=parse_count,
+            help='Число групп; по умолчанию — сотая часть пользователей.',
+        )
+        parser.add_argument(
+            '--follows-per-user', type=float, default=10,
+            help='Среднее число подписок пользователя.',
+        )
+        parser.add_argument(
+            '--comments-per-post', type=float, default=2,
+            help='Среднее число комментариев к посту.',
+        )
+        parser.add_argument(
+            '--image-share', type=float, default=0.1,
+            help='Доля постов с картинкой.',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько последних дней распределены посты.',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора: один и тот же набор при повторе.',
+        )
+        parser.add_argument(
+            '--prefix', default='user',
+            help='Префикс имен пользователей и адресов групп.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Число объектов в одной пачке (и транзакции).',
+        )
+
+    def handle(self, *args, **options):
+        if options['posts'] < 1:
+            raise CommandError('Нужен хотя бы один пост.')
+        generator = DatasetGenerator(
+            options['posts'],
+            users=options['users'],
+            groups=options['groups'],
+            follows_per_user=options['follows_per_user'],
+            comments_per_post=options['comments_per_post'],
+            image_share=options['image_share'],
+            days=options['days'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            prefix=options['prefix'],
+        )
+        steps = (
+            ('пользователи', generator.create_users),
+            ('группы', generator.create_groups),
+            ('подписки', generator.create_follows),
+            ('посты', generator.create_posts),
+            ('ленты', generator.create_timelines),
+        )
+        for name, step in steps:
+            started = time.monotonic()
+            total = 0
+            for size in step():
+                total += size
+                rate = total / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(
+                    f'{name}: {total} ({rate:.0f}/с)', ending='\r'
+                )
+            self.stdout.write(self.style.SUCCESS(f'{name}: {total}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'комментарии: {generator.comments_created}'
+        ))
+        refresh_derived()
+        self.stdout.write(self.style.SUCCESS('Счетчики и кэш обновлены.'))
@@ -0,0 +1,33 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Создает миниатюры для картинок уже опубликованных постов: '
+        'страницы показывают только готовые миниатюры.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.THUMBNAIL_WORKERS or 1,
+            help='Число потоков, создающих миниатюры.',
+        )
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').order_by().values_list(
+            'image', flat=True
+        ).distinct()
+        done = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for _ in pool.map(thumbnails.generate_in_worker, names.iterator()):
+                done += 1
+                self.stdout.write(f'миниатюры: {done}', ending='\r')
+        self.stdout.write(self.style.SUCCESS(f'миниатюры: {done}'))
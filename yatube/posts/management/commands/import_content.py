@@ -0,0 +1,93 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts.importer import (FORMATS, Importer, batches, read_records,
+                            refresh_derived)
+from posts.models import ImportCheckpoint
+
+KINDS = ('posts', 'comments', 'follows')
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты, комментарии или подписки из JSON Lines или CSV '
+        'пачками. Число загруженных записей сохраняется в БД вместе с '
+        'каждой пачкой, и повторный запуск продолжает прерванную '
+        'загрузку с первой незагруженной записи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с записями.')
+        parser.add_argument(
+            '--kind',
+            choices=KINDS,
+            required=True,
+            help=(
+                'Что загружать. Поля записей: posts — id, author, group, '
+                'group_title, text, image, pub_date; comments — id, post, '
+                'author, text, pub_date; follows — user, author.'
+            ),
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Формат файла; по умолчанию — по расширению.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Число записей в одной пачке (и транзакции).',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Забыть прогресс прошлой загрузки файла и начать сначала.',
+        )
+
+    def handle(self, *args, **options):
+        path, kind = options['path'], options['kind']
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(
+            path=os.path.abspath(path), kind=kind
+        )
+        # Id из прерванного запуска неизвестны: после него
+        # пересчитываются все счетчики, иначе — только затронутые.
+        interrupted = checkpoint.done > 0
+        if options['restart']:
+            checkpoint.done = 0
+        done = checkpoint.done
+        if done:
+            self.stdout.write(f'Продолжаем после записи {done}.')
+        records = read_records(path, options['format'])
+        importer = Importer()
+        started = time.monotonic()
+        processed = inserted = 0
+        try:
+            for batch in batches(records, options['batch_size'], skip=done):
+                with transaction.atomic():
+                    inserted += importer.import_batch(kind, batch)
+                    processed += len(batch)
+                    checkpoint.done = done + processed
+                    checkpoint.save(update_fields=['done'])
+                rate = processed / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(
+                    f'{kind}: {done + processed} записей, '
+                    f'добавлено {inserted}, {rate:.0f} записей/с',
+                    ending='\r',
+                )
+        except (KeyError, ValueError) as error:
+            raise CommandError(
+                f'Ошибка в записи после {done + processed}: {error!r}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{kind}: {done + processed} записей, добавлено {inserted}'
+        ))
+        self.refresh(None if interrupted else importer.touched)
+        checkpoint.delete()
+
+    def refresh(self, touched):
+        refresh_derived(**(touched or {}))
+        self.stdout.write(self.style.SUCCESS('Счетчики и кэш обновлены.'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счетчики постов, комментариев '
+        'и подписок пачками, каждая пачка — в своей транзакции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Число объектов в одной пачке.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        steps = (
+            ('пользователи', counters.rebuild_user_stats),
+            ('группы', counters.rebuild_group_counters),
+            ('посты', counters.rebuild_post_counters),
+        )
+        for name, rebuild in steps:
+            total = 0
+            for size in rebuild(batch_size):
+                total += size
+                self.stdout.write(f'{name}: {total}', ending='\r')
+            self.stdout.write(self.style.SUCCESS(f'{name}: {total}'))
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from posts import fts
+
+
+def install(apps, schema_editor):
+    fts.install(schema_editor.connection, rebuild=True)
+
+
+def uninstall(apps, schema_editor):
+    fts.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
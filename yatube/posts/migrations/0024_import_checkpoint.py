@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-17 07:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_post_image_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=500, verbose_name='Файл')),
+                ('kind', models.CharField(max_length=20, verbose_name='Тип записей')),
+                ('done', models.PositiveIntegerField(default=0, verbose_name='Загружено записей')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='importcheckpoint',
+            constraint=models.UniqueConstraint(fields=('path', 'kind'), name='unique_import_checkpoint'),
+        ),
+    ]
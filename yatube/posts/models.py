@@ -4,6 +4,8 @@ from django.db import models
 
 from core.models import CreatedModel
 
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -11,6 +13,11 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        'Число постов',
+        default=0,
+        editable=False
+    )
 
     def __str__(self):
         return self.title
@@ -33,11 +40,37 @@ class Post(CreatedModel):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            # Посты с общей картинкой: их обновляет создание миниатюр.
+            models.Index(fields=['image'], name='post_image_idx'),
+        ]
 
     def __str__(self):
         return self.text[:settings.LIMIT_CHARACTERS_FOR_POST]
@@ -56,6 +89,14 @@ class Comment(CreatedModel):
     )
     text = models.TextField()
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'pub_date'],
+                name='comment_post_pub_date_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.text
 
@@ -78,3 +119,92 @@ class Follow(models.Model):
                 fields=['user', 'author'], name='unique_following'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """
+    Денормализованные счетчики пользователя. Поддерживаются
+    сигналами при создании и удалении постов и подписок, чтобы
+    страницы не считали COUNT(*) на каждый запрос.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0
+    )
+    following_count = models.PositiveIntegerField(
+        'Число подписок',
+        default=0
+    )
+
+
+class TimelineEntry(models.Model):
+    """
+    Материализованная лента подписок: запись о посте автора
+    для каждого его подписчика. Заполняется при публикации поста,
+    дополняется при подписке и очищается при отписке.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField('Дата создания поста')
+
+    class Meta:
+        ordering = ['-pub_date', '-post']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author_idx'
+            ),
+        ]
+
+
+class ImportCheckpoint(models.Model):
+    """
+    Сколько записей файла уже загрузила команда import_content.
+    Меняется в одной транзакции с пачкой, поэтому после сбоя
+    загрузка продолжается ровно с первой незафиксированной записи.
+    """
+    path = models.CharField('Файл', max_length=500)
+    kind = models.CharField('Тип записей', max_length=20)
+    done = models.PositiveIntegerField('Загружено записей', default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['path', 'kind'], name='unique_import_checkpoint'
+            )
+        ]
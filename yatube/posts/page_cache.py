@@ -0,0 +1,110 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.http import HttpResponse
+
+VERSION_KEY = 'page_version:{}'
+PAGE_KEY = 'page:{view}:{versions}:{user}:{path}'
+SITE_SCOPE = 'site'
+
+
+def get_cache():
+    return caches[settings.PAGE_CACHE_ALIAS]
+
+
+def timeout(seconds):
+    """
+    Срок хранения в кэше страниц. Сброс версий в LocMemCache виден
+    только своему процессу, поэтому там срок не больше
+    PAGE_CACHE_LOCAL_TIMEOUT: остальные воркеры отдают старые
+    страницы недолго.
+    """
+    if isinstance(get_cache(), LocMemCache):
+        return min(seconds, settings.PAGE_CACHE_LOCAL_TIMEOUT)
+    return seconds
+
+
+def get_versions(scopes):
+    """
+    Текущие версии областей кэша одним запросом к кэшу.
+    Отсутствующая версия создается заново: так вытеснение ключа
+    версии тоже приводит к инвалидации, а не к старым страницам.
+    """
+    cache = get_cache()
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(*scopes):
+    """Инвалидирует все страницы, зависящие от переданных областей."""
+    version = time.time_ns()
+    get_cache().set_many(
+        {VERSION_KEY.format(scope): version for scope in set(scopes)},
+        None,
+    )
+
+
+def invalidate(*scopes):
+    """
+    Сбрасывает области сразу и еще раз после фиксации транзакции:
+    страница, отрисованная до коммита по старым данным, не
+    переживет второй сброс.
+    """
+    bump(*scopes)
+    transaction.on_commit(lambda: bump(*scopes))
+
+
+def cache_page_versioned(*scopes):
+    """
+    Кэширует GET-ответ представления до изменения данных.
+
+    Области кэша задаются шаблонами, которые заполняются
+    именованными аргументами представления, например
+    'group:{slug}'. Ключ страницы включает версии всех областей,
+    поэтому bump() любой из них делает старые копии недоступными,
+    а разделяемый бэкенд кэша распространяет это на все процессы.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (not settings.PAGE_CACHE_ENABLED
+                    or request.method not in ('GET', 'HEAD')):
+                return view(request, *args, **kwargs)
+            versions = get_versions(
+                [SITE_SCOPE] + [scope.format(**kwargs) for scope in scopes]
+            )
+            key = PAGE_KEY.format(
+                view=view.__name__,
+                versions='.'.join(map(str, versions)),
+                user=request.user.pk or 0,
+                path=hashlib.md5(
+                    request.get_full_path().encode()
+                ).hexdigest(),
+            )
+            cache = get_cache()
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+            response = view(request, *args, **kwargs)
+            if (response.status_code == 200 and not response.streaming
+                    and not response.cookies
+                    and not request.META.get('CSRF_COOKIE_USED')):
+                cache.set(
+                    key,
+                    (response.content, response['Content-Type']),
+                    timeout(settings.PAGE_CACHE_TIMEOUT),
+                )
+            return response
+        return wrapper
+    return decorator
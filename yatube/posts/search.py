@@ -0,0 +1,110 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .fts import FTS_TABLE
+from .models import Post
+from .utils import KeysetPaginator, paginator
+
+# Маркеры подсветки из символов частной зоны Unicode: их заменяют
+# на <mark> уже после экранирования текста поста.
+MARK_START = '\ue000'
+MARK_END = '\ue001'
+SNIPPET_TOKENS = 24
+MAX_TERMS = 8
+
+
+def fts_query(text):
+    """
+    Запрос FTS5 из пользовательского ввода: каждое слово становится
+    префиксным термином в кавычках, так что синтаксис FTS5 во вводе
+    не действует. Пустая строка — искать нечего.
+    """
+    terms = re.findall(r'\w+', text)[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+class SearchPaginator(KeysetPaginator):
+    """
+    Постраничный вывод результатов поиска по ключу (rank, rowid):
+    следующая страница выбирается условием на релевантность bm25
+    и id последнего результата. Записи страницы — посты с
+    подсвеченным фрагментом текста в snippet.
+    """
+
+    def __init__(self, query, per_page):
+        super().__init__([], per_page)
+        self.query = query
+
+    def _fetch_rows(self, key, reverse, limit):
+        rows = self._search(key, reverse, limit)
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [row[0] for row in rows]
+        )
+        results = []
+        for post_id, rank, snippet in rows:
+            post = posts.get(post_id)
+            if post is not None:
+                post.rank = rank
+                post.snippet = highlight(snippet)
+                results.append(post)
+        return results
+
+    def _search(self, key, reverse, limit):
+        order, comparison = ('DESC', '<') if reverse else ('ASC', '>')
+        sql = (
+            f'SELECT rowid, rank, snippet({FTS_TABLE}, 0, %s, %s, %s, %s) '
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+        )
+        params = [MARK_START, MARK_END, '…', SNIPPET_TOKENS, self.query]
+        if key is not None:
+            sql += (
+                f' AND (rank {comparison} %s'
+                f' OR (rank = %s AND rowid {comparison} %s))'
+            )
+            rank, post_id = key
+            params += [rank, rank, post_id]
+        sql += f' ORDER BY rank {order}, rowid {order} LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    @staticmethod
+    def _key_values(post):
+        return [repr(post.rank), str(post.pk)]
+
+    @staticmethod
+    def _parse_key(values):
+        rank, post_id = values
+        return float(rank), int(post_id)
+
+
+def search_posts(text, request):
+    """
+    Страница постов, найденных по тексту, в порядке релевантности.
+    Без FTS5 (не SQLite) — простой поиск по вхождению, новые сверху.
+    """
+    if connection.vendor != 'sqlite':
+        post_list = Post.objects.filter(
+            text__icontains=text
+        ).select_related('author', 'group')
+        return paginator(post_list, request)
+    search_paginator = SearchPaginator(
+        fts_query(text), settings.POSTS_PER_PAGE
+    )
+    return search_paginator.page_by_cursor(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
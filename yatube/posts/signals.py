@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, page_cache, timeline
+from .models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+def _author_scopes(*user_ids):
+    usernames = User.objects.filter(
+        pk__in=user_ids
+    ).values_list('username', flat=True)
+    return [f'author:{username}' for username in usernames]
+
+
+def _group_scopes(*group_ids):
+    slugs = Group.objects.filter(
+        pk__in=[group_id for group_id in group_ids if group_id]
+    ).values_list('slug', flat=True)
+    return [f'group:{slug}' for slug in slugs]
+
+
+def _invalidate_post(post, *group_ids):
+    page_cache.invalidate(
+        'global',
+        *_author_scopes(post.author_id),
+        *_group_scopes(post.group_id, *group_ids),
+    )
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, raw, **kwargs):
+    if instance.pk is None or raw:
+        return
+    instance._previous_group_id = Post.objects.filter(
+        pk=instance.pk
+    ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if created:
+        counters.post_added(instance)
+        timeline.fan_out(instance)
+    elif hasattr(instance, '_previous_group_id'):
+        counters.post_moved(previous_group_id, instance.group_id)
+    _invalidate_post(instance, previous_group_id)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.post_added(instance, delta=-1)
+    _invalidate_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.comment_added(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.comment_added(instance, delta=-1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.follow_added(instance)
+        timeline.backfill(instance.user_id, instance.author_id)
+        page_cache.invalidate(
+            *_author_scopes(instance.user_id, instance.author_id)
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.follow_added(instance, delta=-1)
+    timeline.prune(instance.user_id, instance.author_id)
+    page_cache.invalidate(
+        *_author_scopes(instance.user_id, instance.author_id)
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    # Название группы выводится в карточках постов на всех лентах.
+    page_cache.invalidate(page_cache.SITE_SCOPE)
@@ -0,0 +1,36 @@
+import hashlib
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранит файлы под именем из SHA-256 содержимого.
+
+    Одинаковые загрузки занимают место один раз: повторный файл не
+    записывается, а посты ссылаются на уже сохраненный. Миниатюры
+    sorl привязаны к имени файла, поэтому тоже общие для всех
+    таких постов.
+    """
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        directory, filename = posixpath.split(name)
+        digest = self.digest(content)
+        extension = posixpath.splitext(filename)[1].lower()
+        name = posixpath.join(directory, digest[:2], digest + extension)
+        if self.exists(name):
+            return name
+        return self._save(name, content)
+
+    @staticmethod
+    def digest(content):
+        sha256 = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        content.seek(0)
+        return sha256.hexdigest()
@@ -0,0 +1,62 @@
+from django import template
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts import page_cache, thumbnails
+
+register = template.Library()
+
+CARD_KEY = 'post_card:{site}:{id}:{updated}:{flags}'
+
+
+def card_key(post, site_version, **flags):
+    return CARD_KEY.format(
+        site=site_version,
+        id=post.pk,
+        updated=post.updated.timestamp(),
+        flags=''.join(str(int(bool(flag))) for flag in flags.values()),
+    )
+
+
+@register.simple_tag
+def post_cards(posts, show_group_link=False, show_author_link=False):
+    """
+    Отрисованные карточки постов страницы.
+
+    Карточки берутся из кэша одним get_many; отсутствующие
+    отрисовываются и сохраняются одним set_many. Ключ включает
+    время изменения поста, поэтому правка поста сбрасывает только
+    его карточку, а версия области site — переименование групп.
+    Миниатюры для отрисовки ищутся сразу для всех промахов.
+    """
+    posts = list(posts)
+    flags = {
+        'show_group_link': show_group_link,
+        'show_author_link': show_author_link,
+    }
+    cache = page_cache.get_cache()
+    site_version, = page_cache.get_versions([page_cache.SITE_SCOPE])
+    keys = [card_key(post, site_version, **flags) for post in posts]
+    cards = cache.get_many(keys)
+    missed = [
+        (post, key) for post, key in zip(posts, keys) if key not in cards
+    ]
+    variants = thumbnails.lookup_many([post.image for post, _ in missed])
+    rendered = {}
+    for post, key in missed:
+        picture = None
+        if post.image:
+            picture = thumbnails.picture(
+                post.image, variants[post.image.name]
+            )
+        rendered[key] = render_to_string(
+            'includes/post_card.html',
+            {'post': post, 'picture': picture, **flags},
+        )
+    if rendered:
+        cache.set_many(
+            rendered, page_cache.timeout(settings.POST_CARD_CACHE_TIMEOUT)
+        )
+        cards.update(rendered)
+    return [mark_safe(cards[key]) for key in keys]
@@ -0,0 +1,14 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_picture(image):
+    """Данные для <picture> картинки поста или None, если ее нет."""
+    if not image:
+        return None
+    variants = thumbnails.lookup_many([image])[image.name]
+    return thumbnails.picture(image, variants)
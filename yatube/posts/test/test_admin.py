@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Group, Post, User
+from .utils import QueryBudgetMixin
+
+
+class PostAdminTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='test_admin', email='admin@example.com', password='pass'
+        )
+        for i in range(20):
+            author = User.objects.create_user(username=f'test_author{i}')
+            group = Group.objects.create(
+                title=f'Группа {i}',
+                slug=f'group-{i}',
+                description='Тестовое описание',
+            )
+            Post.objects.create(
+                author=author, group=group, text=f'Пост номер {i}'
+            )
+        Post.objects.create(author=cls.admin, text='Особенный пост')
+        cls.changelist = reverse('admin:posts_post_changelist')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(PostAdminTests.admin)
+
+    def test_changelist_fits_query_budget(self):
+        """
+        Число запросов changelist не зависит от числа постов,
+        а в каждой строке выводится только выбранная группа.
+        """
+        with self.assertMaxNumQueries(8):
+            response = self.client.get(PostAdminTests.changelist)
+        self.assertEqual(response.context['cl'].result_count, 21)
+        self.assertContains(response, 'Группа 7</option>', count=1)
+
+    def test_search_uses_full_text_index(self):
+        """Поиск в админке идет по индексу FTS5."""
+        response = self.client.get(
+            PostAdminTests.changelist, {'q': 'особенный'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list),
+            [Post.objects.get(text='Особенный пост')],
+        )
+        self.assertIn(
+            'posts_post_fts', str(response.context['cl'].queryset.query)
+        )
+
+    @override_settings(ADMIN_COUNT_CAP=5)
+    def test_filtered_count_is_capped(self):
+        """Отфильтрованный список считается не дальше предела."""
+        response = self.client.get(PostAdminTests.changelist, {'q': 'пост'})
+        self.assertEqual(response.context['cl'].result_count, 5)
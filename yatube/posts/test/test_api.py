@@ -0,0 +1,123 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Group, Post, User
+from .utils import QueryBudgetMixin
+
+
+class ApiTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, group=cls.group, text=f'Пост {number}'
+            )
+            for number in range(3)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.user, text='Комментарий'
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    @override_settings(POSTS_PER_PAGE=2)
+    def test_feeds_are_cursor_paginated(self):
+        """Ленты API листаются курсорами, новые посты сверху."""
+        for url in (
+            reverse('posts:api_posts'),
+            reverse('posts:api_group_posts', args=['test-slug']),
+            reverse('posts:api_profile_posts', args=['test_author']),
+        ):
+            with self.subTest(url=url):
+                first = self.client.get(url).json()
+                self.assertEqual(
+                    [post['text'] for post in first['results']],
+                    ['Пост 2', 'Пост 1'],
+                )
+                self.assertIsNone(first['previous'])
+                second = self.client.get(url, {'after': first['next']}).json()
+                self.assertEqual(
+                    [post['text'] for post in second['results']], ['Пост 0']
+                )
+                self.assertIsNone(second['next'])
+
+    def test_fields_selection(self):
+        """?fields= ограничивает поля ответа и читаемые колонки."""
+        url = reverse('posts:api_posts')
+        with self.assertMaxNumQueries(1) as context:
+            response = self.client.get(url, {'fields': 'id,author'})
+        self.assertEqual(
+            response.json()['results'][0],
+            {'id': self.posts[2].id, 'author': 'test_author'},
+        )
+        self.assertNotIn('"text"', context.captured_queries[0]['sql'])
+        self.assertNotIn(b': ', response.content)
+        response = self.client.get(url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_detail(self):
+        url = reverse('posts:api_post_detail', args=[self.posts[0].id])
+        data = self.client.get(url).json()
+        self.assertEqual(data['group'], 'test-slug')
+        self.assertEqual(data['comments_count'], 1)
+        self.assertNotIn('comments', data)
+        data = self.client.get(url, {'fields': 'id,comments'}).json()
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']['results']],
+            ['Комментарий'],
+        )
+        url = reverse('posts:api_post_detail', args=[0])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('detail', response.json())
+
+    @override_settings(COMMENTS_PER_PAGE=2)
+    def test_post_comments_are_cursor_paginated(self):
+        """Комментарии отдаются страницами, а не все сразу."""
+        post = self.posts[1]
+        for number in range(3):
+            Comment.objects.create(
+                post=post, author=self.user, text=f'Комментарий {number}'
+            )
+        detail = self.client.get(
+            reverse('posts:api_post_detail', args=[post.id]),
+            {'fields': 'id,comments'},
+        ).json()['comments']
+        self.assertEqual(
+            [comment['text'] for comment in detail['results']],
+            ['Комментарий 0', 'Комментарий 1'],
+        )
+        url = reverse('posts:api_post_comments', args=[post.id])
+        with self.assertMaxNumQueries(2):
+            rest = self.client.get(url, {'after': detail['next']}).json()
+        self.assertEqual(
+            [comment['text'] for comment in rest['results']],
+            ['Комментарий 2'],
+        )
+        self.assertIsNone(rest['next'])
+        response = self.client.get(
+            reverse('posts:api_post_comments', args=[0])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_etag_revalidation(self):
+        """Неизменившийся ответ отдается как 304 по строгому ETag."""
+        url = reverse('posts:api_posts')
+        etag = self.client.get(url)['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
@@ -0,0 +1,365 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db.models import Count, Sum
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..importer import Importer
+from ..models import (Comment, Follow, Group, ImportCheckpoint, Post,
+                      TimelineEntry, User, UserStats)
+
+
+class ExplainFeedsCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.author = User.objects.create_user(username='test_author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            group=cls.group,
+            text='Тестовый пост',
+        )
+        Comment.objects.create(
+            post=cls.post,
+            author=cls.user,
+            text='Тестовый комментарий',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент не сканируют таблицы целиком и не сортируют."""
+        cache.clear()
+        out = StringIO()
+        call_command('explain_feeds', strict=True, stdout=out)
+        self.assertIn('posts:follow_index', out.getvalue())
+
+    def test_error_response_fails(self):
+        """Страница с ошибкой не выдается за проверенную ленту."""
+        pages = [('posts:profile', '/profile/nobody/', None)]
+        with mock.patch(
+            'posts.management.commands.explain_feeds.Command.get_pages',
+            return_value=pages,
+        ):
+            with self.assertRaisesMessage(CommandError, 'ответ 404'):
+                call_command('explain_feeds', stdout=StringIO())
+
+
+class RebuildCountersCommandTests(TestCase):
+    def test_counters_rebuilt_after_drift(self):
+        """Команда восстанавливает разошедшиеся счетчики."""
+        user = User.objects.create_user(username='test_user')
+        author = User.objects.create_user(username='test_author')
+        group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        post = Post.objects.create(author=author, group=group, text='Пост')
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+        Follow.objects.create(user=user, author=author)
+        UserStats.objects.all().delete()
+        Group.objects.update(posts_count=0)
+        Post.objects.update(comments_count=0)
+        call_command('rebuild_counters', batch_size=1, stdout=StringIO())
+        author.stats.refresh_from_db()
+        group.refresh_from_db()
+        post.refresh_from_db()
+        self.assertEqual(author.stats.posts_count, 1)
+        self.assertEqual(author.stats.followers_count, 1)
+        self.assertEqual(UserStats.objects.get(user=user).following_count, 1)
+        self.assertEqual(group.posts_count, 1)
+        self.assertEqual(post.comments_count, 1)
+
+
+class ImportContentCommandTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        cache.clear()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as target:
+            target.write(content)
+        return path
+
+    def write_jsonl(self, name, records):
+        return self.write(
+            name, ''.join(json.dumps(record) + '\n' for record in records)
+        )
+
+    def test_import_posts_comments_and_follows(self):
+        """
+        Импорт сохраняет даты, заполняет ленты подписчиков
+        и пересчитывает счетчики.
+        """
+        follows = self.write(
+            'follows.csv', 'user,author\nreader,writer\nwriter,writer\n'
+        )
+        posts = self.write_jsonl('posts.jsonl', [
+            {
+                'id': 10 + number,
+                'author': 'writer',
+                'group': 'imported',
+                'group_title': 'Импорт',
+                'text': f'Пост {number}',
+                'pub_date': f'2020-01-0{number}T12:00:00',
+            }
+            for number in range(1, 6)
+        ])
+        comments = self.write(
+            'comments.csv',
+            'post,author,text\n11,reader,Комментарий\n999,reader,Мимо\n',
+        )
+        for path, kind in (
+            (follows, 'follows'), (posts, 'posts'), (comments, 'comments')
+        ):
+            call_command(
+                'import_content', path, kind=kind, batch_size=2,
+                stdout=StringIO(),
+            )
+        writer = User.objects.get(username='writer')
+        reader = User.objects.get(username='reader')
+        post = Post.objects.get(pk=11)
+        self.assertEqual(
+            post.pub_date,
+            timezone.make_aware(datetime(2020, 1, 1, 12)),
+        )
+        self.assertEqual(post.group.title, 'Импорт')
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(TimelineEntry.objects.filter(user=reader).count(), 5)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(writer.stats.posts_count, 5)
+        self.assertEqual(writer.stats.followers_count, 1)
+        self.assertEqual(post.group.posts_count, 5)
+        self.assertEqual(post.comments_count, 1)
+
+    def test_import_is_idempotent_and_resumable(self):
+        """
+        Повторная загрузка не дублирует посты, а загрузка с точкой
+        сохранения продолжается с первой незагруженной записи.
+        """
+        records = [
+            {'id': number, 'author': 'writer', 'text': f'Пост {number}'}
+            for number in range(1, 5)
+        ]
+        path = self.write_jsonl('posts.jsonl', records)
+        call_command(
+            'import_content', path, kind='posts', stdout=StringIO()
+        )
+        call_command(
+            'import_content', path, kind='posts', stdout=StringIO()
+        )
+        self.assertEqual(Post.objects.count(), 4)
+        Post.objects.all().delete()
+        ImportCheckpoint.objects.create(
+            path=os.path.abspath(path), kind='posts', done=3
+        )
+        call_command(
+            'import_content', path, kind='posts', stdout=StringIO()
+        )
+        self.assertEqual(
+            list(Post.objects.values_list('pk', flat=True)), [4]
+        )
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_checkpoint_committed_with_batch(self):
+        """
+        После сбоя посты без id не загружаются повторно: точка
+        сохранения зафиксирована вместе с пачкой.
+        """
+        path = self.write_jsonl('posts.jsonl', [
+            {'author': 'writer', 'text': f'Пост {number}'}
+            for number in range(4)
+        ])
+        import_batch = Importer.import_batch
+        calls = []
+
+        def fail_second_batch(importer, kind, records):
+            calls.append(kind)
+            if len(calls) == 2:
+                raise KeyError('author')
+            return import_batch(importer, kind, records)
+
+        with self.assertRaises(CommandError):
+            with mock.patch.object(
+                Importer, 'import_batch', autospec=True,
+                side_effect=fail_second_batch,
+            ):
+                call_command(
+                    'import_content', path, kind='posts', batch_size=2,
+                    stdout=StringIO(),
+                )
+        call_command(
+            'import_content', path, kind='posts', batch_size=2,
+            stdout=StringIO(),
+        )
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            ['Пост 0', 'Пост 1', 'Пост 2', 'Пост 3'],
+        )
+
+    def test_only_touched_counters_rebuilt(self):
+        """
+        После загрузки пересчитываются счетчики только тех
+        пользователей, групп и постов, которых она затронула.
+        """
+        bystander = User.objects.create_user(username='bystander')
+        Post.objects.create(author=bystander, text='Пост')
+        UserStats.objects.filter(user=bystander).update(posts_count=7)
+        path = self.write_jsonl('posts.jsonl', [
+            {'author': 'writer', 'group': 'imported', 'text': 'Пост'},
+        ])
+        call_command(
+            'import_content', path, kind='posts', stdout=StringIO()
+        )
+        writer = User.objects.get(username='writer')
+        self.assertEqual(writer.stats.posts_count, 1)
+        self.assertEqual(Group.objects.get(slug='imported').posts_count, 1)
+        bystander.stats.refresh_from_db()
+        self.assertEqual(bystander.stats.posts_count, 7)
+
+    def test_follows_counted_and_backfilled_once(self):
+        """Повторные подписки не считаются добавленными."""
+        Post.objects.create(
+            author=User.objects.create_user(username='writer'), text='Пост'
+        )
+        path = self.write(
+            'follows.csv', 'user,author\nreader,writer\nreader,writer\n'
+        )
+        out = StringIO()
+        call_command('import_content', path, kind='follows', stdout=out)
+        self.assertIn('добавлено 1', out.getvalue())
+        out = StringIO()
+        call_command('import_content', path, kind='follows', stdout=out)
+        self.assertIn('добавлено 0', out.getvalue())
+        self.assertEqual(TimelineEntry.objects.count(), 1)
+
+
+class GenerateDatasetCommandTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.media, ignore_errors=True)
+        cache.clear()
+
+    def test_dataset_is_consistent(self):
+        """
+        Набор данных нужного размера согласован: ленты, счетчики и
+        картинки соответствуют постам и подпискам.
+        """
+        with override_settings(MEDIA_ROOT=self.media):
+            call_command(
+                'generate_dataset', '--posts=300', '--users=40',
+                '--image-share=0.2', '--batch-size=64', stdout=StringIO(),
+            )
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(User.objects.count(), 40)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(Comment.objects.exists())
+        self.assertEqual(
+            UserStats.objects.aggregate(total=Sum('posts_count'))['total'],
+            300,
+        )
+        expected_entries = sum(
+            Follow.objects.filter(author_id=author_id).count() * posts
+            for author_id, posts in Post.objects.values_list(
+                'author'
+            ).annotate(posts=Count('id'))
+        )
+        self.assertEqual(TimelineEntry.objects.count(), expected_entries)
+        images = set(
+            Post.objects.exclude(image='').values_list('image', flat=True)
+        )
+        self.assertTrue(0 < len(images) <= 20)
+        for name in images:
+            self.assertTrue(os.path.exists(os.path.join(self.media, name)))
+        top, *_ = Post.objects.values('author').annotate(
+            posts=Count('id')
+        ).order_by('-posts')
+        self.assertGreater(top['posts'], 300 / 40)
+
+
+class BenchmarkCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        reader = User.objects.create_user(username='test_reader')
+        author = User.objects.create_user(username='test_author')
+        group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        post = Post.objects.create(author=author, group=group, text='Пост')
+        Comment.objects.create(post=post, author=reader, text='Комментарий')
+        Follow.objects.create(user=reader, author=author)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.baseline = os.path.join(self.directory, 'baseline.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        cache.clear()
+
+    def benchmark(self, *args):
+        call_command(
+            'benchmark', '--requests=3', '--warmup=0',
+            f'--baseline={self.baseline}', *args, stdout=StringIO(),
+        )
+
+    def test_baseline_saved_and_changes_rolled_back(self):
+        """
+        Прогон записывает показатели всех представлений и откатывает
+        посты и комментарии, созданные формами.
+        """
+        self.benchmark('--save-baseline')
+        with open(self.baseline, encoding='utf-8') as source:
+            results = json.load(source)
+        self.assertEqual(set(results), {
+            'index', 'group_posts', 'profile', 'post_detail',
+            'follow_index', 'post_create', 'add_comment',
+        })
+        for result in results.values():
+            self.assertGreater(result['queries'], 0)
+            self.assertLessEqual(result['p50'], result['p99'])
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_regression_fails_comparison(self):
+        """Рост числа запросов относительно базовой линии — ошибка."""
+        self.benchmark('--views', 'index', '--save-baseline')
+        with open(self.baseline, encoding='utf-8') as source:
+            results = json.load(source)
+        results['index']['queries'] -= 1
+        results['index']['p50'] = results['index']['p95'] = 1e9
+        with open(self.baseline, 'w', encoding='utf-8') as target:
+            json.dump(results, target)
+        with self.assertRaisesMessage(CommandError, 'Регрессии'):
+            self.benchmark('--views', 'index')
+
+    def test_missing_baseline_fails(self):
+        """Явно указанная, но отсутствующая базовая линия — ошибка."""
+        with self.assertRaisesMessage(CommandError, 'Нет базовой линии'):
+            self.benchmark('--views', 'index')
@@ -1,17 +1,23 @@
+import io
+import os
 import shutil
 import tempfile
+from unittest import mock
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from .. import thumbnails
 from ..models import Comment, Post, Group, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
 class PostFormTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -86,7 +92,10 @@ class PostFormTests(TestCase):
         self.assertEqual(Post.objects.first().author, PostFormTests.user)
         self.assertEqual(Post.objects.first().group, PostFormTests.group)
         self.assertEqual(Post.objects.first().text, 'Новый текст')
-        self.assertEqual(Post.objects.first().image, 'posts/small.gif')
+        self.assertRegex(
+            Post.objects.first().image.name,
+            r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.gif$'
+        )
 
     def test_form_post_editing(self):
         """
@@ -215,3 +224,170 @@ class PostFormTests(TestCase):
             )
         )
         self.assertEqual(Comment.objects.count(), comment_count)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class PostThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='thumb_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = Client()
+        self.author.force_login(PostThumbnailTests.user)
+
+    def test_thumbnails_are_generated_after_save(self):
+        """
+        Миниатюры ставятся в очередь при сохранении формы, а страница
+        до их готовности показывает исходную картинку.
+        """
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        uploaded = SimpleUploadedFile(
+            name='thumb.gif',
+            content=small_gif,
+            content_type='image/gif'
+        )
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            self.author.post(
+                reverse('posts:post_create'),
+                data={'text': 'Пост с картинкой', 'image': uploaded},
+            )
+        post = Post.objects.get(text='Пост с картинкой')
+        schedule.assert_called_once_with(post.image.name)
+        self.assertIsNone(thumbnails.lookup(post.image, 'card'))
+        profile_url = reverse(
+            'posts:profile', kwargs={'username': PostThumbnailTests.user}
+        )
+        self.assertContains(self.author.get(profile_url), post.image.url)
+        thumbnails.generate(post.image.name)
+        thumbnail = thumbnails.lookup(post.image, 'card')
+        self.assertIsNotNone(thumbnail)
+        response = self.author.get(profile_url)
+        self.assertContains(response, thumbnail.url)
+        webp = thumbnails.lookup(post.image, 'card_480_webp')
+        self.assertTrue(webp.name.endswith('.webp'))
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, f'{webp.url} 480w')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class PostImageIngestionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='image_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author = Client()
+        self.author.force_login(PostImageIngestionTests.user)
+
+    def upload(self, name='photo.jpg', orientation=None):
+        buffer = io.BytesIO()
+        exif = Image.Exif()
+        if orientation:
+            exif[0x0112] = orientation
+        Image.new('RGB', (300, 100), 'red').save(
+            buffer, format='JPEG', exif=exif
+        )
+        return SimpleUploadedFile(
+            name=name, content=buffer.getvalue(), content_type='image/jpeg'
+        )
+
+    def create_post(self, text, image):
+        return self.author.post(
+            reverse('posts:post_create'),
+            data={'text': text, 'image': image},
+        )
+
+    def test_same_image_is_stored_once(self):
+        """Одинаковые картинки сохраняются одним файлом."""
+        self.create_post('Первый', self.upload('first.jpg'))
+        self.create_post('Второй', self.upload('second.JPG'))
+        first = Post.objects.get(text='Первый').image
+        second = Post.objects.get(text='Второй').image
+        self.assertEqual(first.name, second.name)
+        self.assertEqual(
+            os.listdir(os.path.dirname(first.path)),
+            [os.path.basename(first.name)],
+        )
+
+    @override_settings(POST_IMAGE_MAX_SIDE=50)
+    def test_image_is_normalized(self):
+        """
+        Картинка поворачивается по EXIF, уменьшается и
+        пересохраняется без метаданных.
+        """
+        self.create_post('Фото', self.upload(orientation=6))
+        post = Post.objects.get(text='Фото')
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (17, 50))
+            self.assertEqual(len(image.getexif()), 0)
+
+    @override_settings(POST_IMAGE_MAX_SIDE=50)
+    def test_animation_is_downscaled(self):
+        """Анимация уменьшается покадрово и остается анимацией."""
+        frames = [
+            Image.new('RGB', (100, 40), color)
+            for color in ('red', 'green', 'blue')
+        ]
+        buffer = io.BytesIO()
+        frames[0].save(
+            buffer, format='GIF', save_all=True,
+            append_images=frames[1:], duration=80, loop=0,
+        )
+        self.create_post('Анимация', SimpleUploadedFile(
+            'animation.gif', buffer.getvalue(), content_type='image/gif'
+        ))
+        post = Post.objects.get(text='Анимация')
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (50, 20))
+            self.assertEqual(image.n_frames, 3)
+            self.assertEqual(image.info['duration'], 80)
+
+    def test_unsupported_format_rejected(self):
+        """Формат, который сайт не пересохраняет, отклоняется формой."""
+        buffer = io.BytesIO()
+        Image.new('RGB', (20, 10), 'red').save(buffer, format='BMP')
+        response = self.create_post('BMP', SimpleUploadedFile(
+            'picture.bmp', buffer.getvalue(), content_type='image/bmp'
+        ))
+        self.assertFormError(
+            response, 'form', 'image',
+            'Поддерживаются только JPEG, PNG, WEBP и GIF.',
+        )
+
+    def test_limits_are_enforced_before_decoding(self):
+        """Слишком тяжелые и слишком большие картинки отклоняются."""
+        limits = (
+            ({'POST_IMAGE_MAX_BYTES': 100}, 'Файл слишком большой.'),
+            (
+                {'POST_IMAGE_MAX_PIXELS': 100},
+                'Слишком большое разрешение картинки.',
+            ),
+        )
+        for limit, error in limits:
+            with self.subTest(limit=limit), self.settings(**limit):
+                response = self.create_post('Лишнее', self.upload())
+                self.assertFormError(response, 'form', 'image', error)
+        self.assertFalse(Post.objects.filter(text='Лишнее').exists())
@@ -0,0 +1,105 @@
+import multiprocessing
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from core.middleware import timed
+
+from ..models import Post, User
+
+TEMP_METRICS_DIR = tempfile.mkdtemp()
+
+
+def _child_request_count():
+    """Запрос, посчитанный в другом процессе."""
+    metrics.registry.inc(
+        'yatube_http_responses_total',
+        {'view': 'posts:index', 'status': '200'},
+    )
+    metrics.registry.flush(force=True)
+
+
+@override_settings(METRICS_DIR=TEMP_METRICS_DIR)
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_author')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_METRICS_DIR, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(TEMP_METRICS_DIR, ignore_errors=True)
+        metrics.registry.reset()
+        cache.clear()
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        return response.content.decode()
+
+    def test_request_metrics(self):
+        """Время, статус, SQL и кэш считаются по имени URL."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('about:author'))
+        text = self.scrape()
+        self.assertIn(
+            'yatube_http_request_duration_seconds_count'
+            '{view="posts:index"} 2',
+            text,
+        )
+        self.assertIn(
+            'yatube_http_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2',
+            text,
+        )
+        self.assertIn(
+            'yatube_http_responses_total'
+            '{status="200",view="about:author"} 1',
+            text,
+        )
+        self.assertIn(
+            'yatube_db_queries_per_request_count{view="posts:index"} 2',
+            text,
+        )
+        self.assertIn('yatube_cache_hit_ratio{view="posts:index"}', text)
+        self.assertNotIn('view="metrics"', text)
+
+    def test_section_histogram(self):
+        with timed('thumbnails'):
+            pass
+        self.assertIn(
+            'yatube_section_duration_seconds_count'
+            '{section="thumbnails"} 1',
+            self.scrape(),
+        )
+
+    def test_processes_aggregated(self):
+        """Счетчики процессов складываются через общий каталог."""
+        self.client.get(reverse('posts:index'))
+        process = multiprocessing.get_context('fork').Process(
+            target=_child_request_count
+        )
+        process.start()
+        process.join()
+        self.assertIn(
+            'yatube_http_responses_total'
+            '{status="200",view="posts:index"} 2',
+            self.scrape(),
+        )
+
+    def test_remote_address_forbidden(self):
+        response = self.client.get(
+            reverse('metrics'), REMOTE_ADDR='203.0.113.5'
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,97 @@
+import json
+import re
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.middleware import RequestTiming, _current, _instrument
+
+from ..models import Post, User
+
+
+class ServerTimingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_author')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def tearDown(self):
+        cache.clear()
+
+    def timing(self, response):
+        return dict(
+            (name, params) for name, params in re.findall(
+                r'(\w+);((?:[^,"]|"[^"]*")*)', response['Server-Timing']
+            )
+        )
+
+    def test_header_and_log_line(self):
+        """
+        Ответ содержит SQL, шаблоны и кэш в Server-Timing, а лог —
+        ту же сводку JSON с именем представления.
+        """
+        with self.assertLogs('core.middleware', 'INFO') as logs:
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(reverse('posts:index'))
+        timing = self.timing(response)
+        self.assertIn(f'desc="{len(context)} queries"', timing['db'])
+        self.assertIn('dur=', timing['tpl'])
+        self.assertIn('misses', timing['cache'])
+        self.assertIn('dur=', timing['total'])
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['db_queries'], len(context))
+        self.assertGreater(record['cache_misses'], 0)
+
+    def test_cache_hits_counted(self):
+        """Страница из кэша — только попадания и ни одного запроса к БД."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        with self.assertLogs('core.middleware', 'INFO') as logs:
+            self.client.get(url)
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['db_queries'], 0)
+        self.assertEqual(record['cache_misses'], 0)
+        self.assertGreater(record['cache_hits'], 0)
+
+    @override_settings(SERVER_TIMING_HEADER=False)
+    def test_header_can_be_disabled(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_get_many_counted_once(self):
+        """Ключи get_many не считаются второй раз во вложенных get."""
+        _instrument()
+        cache.set('a', 1)
+        timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            cache.get_many(['a', 'b', 'c'])
+            cache.get('a')
+        finally:
+            _current.reset(token)
+        self.assertEqual((timing.cache_hits, timing.cache_misses), (2, 2))
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'test_cache_table',
+    }})
+    def test_get_through_get_many_counted_once(self):
+        """DatabaseCache.get читает через get_many; ключ считается раз."""
+        call_command('createcachetable', verbosity=0)
+        _instrument()
+        cache.set('a', 1)
+        timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            cache.get('a')
+            cache.get('b')
+        finally:
+            _current.reset(token)
+        self.assertEqual((timing.cache_hits, timing.cache_misses), (1, 1))
@@ -1,7 +1,7 @@
 from django.conf import settings
 from django.test import TestCase
 
-from ..models import Group, Post, User
+from ..models import Comment, Follow, Group, Post, User
 
 
 class PostModelTest(TestCase):
@@ -30,3 +30,79 @@ class PostModelTest(TestCase):
         for field, expected_value in field_str.items():
             with self.subTest(field=field):
                 self.assertEqual(field, expected_value)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.author = User.objects.create_user(username='test_autor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.group_edit = Group.objects.create(
+            title='Вторая тестовая группа',
+            slug='edit-slug',
+            description='Тестовое описание',
+        )
+
+    def refresh(self, *objects):
+        for obj in objects:
+            obj.refresh_from_db()
+
+    def test_post_counters(self):
+        """Счетчики постов автора и группы следуют за постами."""
+        post = Post.objects.create(
+            author=CountersTest.author,
+            group=CountersTest.group,
+            text='Тестовый пост',
+        )
+        stats = CountersTest.author.stats
+        self.refresh(stats, CountersTest.group)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(CountersTest.group.posts_count, 1)
+        post.group = CountersTest.group_edit
+        post.save()
+        self.refresh(CountersTest.group, CountersTest.group_edit)
+        self.assertEqual(CountersTest.group.posts_count, 0)
+        self.assertEqual(CountersTest.group_edit.posts_count, 1)
+        post.delete()
+        self.refresh(stats, CountersTest.group_edit)
+        self.assertEqual(stats.posts_count, 0)
+        self.assertEqual(CountersTest.group_edit.posts_count, 0)
+
+    def test_comment_counter(self):
+        """Счетчик комментариев поста следует за комментариями."""
+        post = Post.objects.create(
+            author=CountersTest.author,
+            text='Тестовый пост',
+        )
+        comment = Comment.objects.create(
+            post=post,
+            author=CountersTest.user,
+            text='Тестовый комментарий',
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_follow_counters(self):
+        """Счетчики подписчиков и подписок следуют за подписками."""
+        follow = Follow.objects.create(
+            user=CountersTest.user,
+            author=CountersTest.author,
+        )
+        author_stats = CountersTest.author.stats
+        user_stats = CountersTest.user.stats
+        self.refresh(author_stats, user_stats)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(user_stats.following_count, 1)
+        follow.delete()
+        self.refresh(author_stats, user_stats)
+        self.assertEqual(author_stats.followers_count, 0)
+        self.assertEqual(user_stats.following_count, 0)
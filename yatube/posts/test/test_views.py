@@ -1,3 +1,5 @@
+import csv
+import json
 import shutil
 import tempfile
 
@@ -9,7 +11,11 @@ from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from ..forms import PostForm
-from ..models import Follow, Group, Post, User
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
+from .. import page_cache
+from ..templatetags.post_cards import card_key
+from ..utils import CountedPaginator
+from .utils import QueryBudgetMixin
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -154,6 +160,21 @@ class PostPagesTests(TestCase):
         author_object = response.context['author']
         self.assertEqual(author_object.username, PostPagesTests.user.username)
 
+    def test_profile_of_user_without_stats(self):
+        """
+        Профиль пользователя, созданного в обход сигналов (как при
+        loaddata), открывается, а счетчики считаются по базе.
+        """
+        User.objects.bulk_create([User(username='loaded')])
+        user = User.objects.get(username='loaded')
+        Post.objects.bulk_create([Post(author=user, text='Из фикстуры')])
+        response = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': user.username})
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['author'].stats.posts_count, 1)
+        self.assertEqual(len(response.context['page_obj']), 1)
+
     def test_post_detail_page_show_correct_context(self):
         """Шаблон post_detail сформирован с правильным контекстом."""
         page_name = reverse(
@@ -197,17 +218,62 @@ class PostPagesTests(TestCase):
 
     def test_cache_works_for_index_pages(self):
         """Кэширование страницы index работает:
-        при удалении записей из БД, они остаются в response.content,
-        до тех пор, пока кэш не будет очищен.
+        повторный запрос отдается из кэша без отрисовки шаблона,
+        а новая запись сбрасывает кэш, и страница обновляется.
         """
+        cache.clear()
         page_name = reverse('posts:index')
         first_response = self.authorized_client.get(page_name)
-        Post.objects.all().delete
         second_response = self.authorized_client.get(page_name)
         self.assertEqual(first_response.content, second_response.content)
-        cache.clear()
+        self.assertIsNone(second_response.context)
+        Post.objects.create(
+            author=PostPagesTests.user,
+            text='Пост после кэширования',
+        )
         third_response = self.authorized_client.get(page_name)
         self.assertNotEqual(third_response.content, first_response.content)
+        self.assertContains(third_response, 'Пост после кэширования')
+
+    def test_local_cache_timeout_is_capped(self):
+        """С LocMemCache, своим в каждом процессе, страницы живут недолго."""
+        self.assertEqual(page_cache.timeout(60 * 60), 60 * 60)
+        local = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}
+        with override_settings(CACHES=local, PAGE_CACHE_LOCAL_TIMEOUT=20):
+            self.assertEqual(page_cache.timeout(60 * 60), 20)
+
+    def test_cache_is_separate_for_each_user(self):
+        """Закэшированная страница одного пользователя
+        не отдается другому."""
+        cache.clear()
+        page_name = reverse('posts:index')
+        self.author.get(page_name)
+        response = self.authorized_client.get(page_name)
+        self.assertContains(response, PostPagesTests.user_2.username)
+
+    def test_post_card_cache_invalidated_only_for_edited_post(self):
+        """Правка поста сбрасывает карточку только этого поста."""
+        cache.clear()
+        other_post = Post.objects.create(
+            author=PostPagesTests.user,
+            text='Другой пост',
+        )
+        self.authorized_client.get(reverse('posts:index'))
+        site_version, = page_cache.get_versions([page_cache.SITE_SCOPE])
+        flags = {'show_group_link': True, 'show_author_link': True}
+        other_key = card_key(other_post, site_version, **flags)
+        self.assertIsNotNone(cache.get(other_key))
+        self.author.post(
+            reverse(
+                'posts:post_edit', kwargs={'post_id': PostPagesTests.post.id}
+            ),
+            data={'text': 'Измененный текст', 'group': ''},
+        )
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Измененный текст')
+        self.assertIsNotNone(cache.get(other_key))
 
     def test_profile_follow_page_for_authorized_client(self):
         """Авторизованный пользователь может подписаться на другого."""
@@ -281,6 +347,28 @@ class PostPagesTests(TestCase):
         )
         self.assertEqual(first_response.content, second_response.content)
 
+    def test_timeline_filled_on_post_create_and_pruned_on_unfollow(self):
+        """
+        Новый пост попадает в материализованную ленту подписчика,
+        а после отписки посты автора из ленты удаляются.
+        """
+        self.authorized_client.get(
+            PostPagesTests.page_follow['сreate_follow']
+        )
+        self.author.post(
+            reverse('posts:post_create'), data={'text': 'Пост для ленты'}
+        )
+        timeline = TimelineEntry.objects.filter(user=PostPagesTests.user_2)
+        self.assertTrue(timeline.filter(post__text='Пост для ленты').exists())
+        self.assertEqual(
+            timeline.count(),
+            Post.objects.filter(author=PostPagesTests.user).count()
+        )
+        self.authorized_client.get(
+            PostPagesTests.page_follow['delete_follow']
+        )
+        self.assertFalse(timeline.exists())
+
 
 class PaginatorTests(TestCase):
     @classmethod
@@ -336,3 +424,438 @@ class PaginatorTests(TestCase):
                     len(response.context['page_obj']),
                     settings.POSTS_TO_CHECK_PAGINATOR - settings.POSTS_PER_PAGE
                 )
+
+    def test_cursor_paginator_pages(self):
+        """Проверка работы курсорной пагинации: переход по ?after=
+        открывает вторую страницу, по ?before= — возвращает на первую.
+        """
+        cache.clear()
+        pages_names = [
+            reverse('posts:index'),
+            reverse(
+                'posts:group_list', kwargs={'slug': PaginatorTests.group.slug}
+            ),
+            reverse(
+                'posts:profile', kwargs={'username': PaginatorTests.user}
+            ),
+            reverse('posts:follow_index'),
+        ]
+        for page_name in pages_names:
+            with self.subTest(page_name=page_name):
+                cache.clear()
+                first_page = self.authorized_client.get(
+                    page_name
+                ).context['page_obj']
+                self.assertFalse(first_page.has_previous())
+                self.assertTrue(first_page.has_next())
+                second_page = self.authorized_client.get(
+                    page_name, {'after': first_page.paginator.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    len(second_page),
+                    settings.POSTS_TO_CHECK_PAGINATOR - settings.POSTS_PER_PAGE
+                )
+                self.assertFalse(second_page.has_next())
+                before = second_page.paginator.previous_cursor
+                previous_page = self.authorized_client.get(
+                    page_name, {'before': before}
+                ).context['page_obj']
+                self.assertEqual(
+                    list(previous_page.object_list),
+                    list(first_page.object_list)
+                )
+                self.assertFalse(previous_page.has_previous())
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(settings.POSTS_PER_PAGE):
+            author = User.objects.create_user(username=f'test_author{i}')
+            group = Group.objects.create(
+                title=f'Группа {i}',
+                slug=f'group-{i}',
+                description='Тестовое описание',
+            )
+            Post.objects.create(
+                author=author,
+                group=group,
+                text=f'Пост {i}',
+                image=f'posts/budget_{i}.gif',
+            )
+            Post.objects.create(
+                author=cls.user,
+                group=cls.group,
+                text=f'Пост читателя {i}',
+                image=f'posts/budget_reader_{i}.gif',
+            )
+            Follow.objects.create(user=cls.user, author=author)
+        cls.pages_budgets = (
+            (reverse('posts:index'), 4),
+            (reverse(
+                'posts:group_list', kwargs={'slug': cls.group.slug}
+            ), 6),
+            (reverse(
+                'posts:profile', kwargs={'username': cls.user}
+            ), 7),
+            (reverse('posts:follow_index'), 4),
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(QueryBudgetTests.user)
+
+    def test_feed_pages_fit_query_budget(self):
+        """
+        Ленты выполняют фиксированное число запросов
+        независимо от числа постов и картинок на странице.
+        """
+        for page_name, budget in QueryBudgetTests.pages_budgets:
+            with self.subTest(page_name=page_name):
+                cache.clear()
+                with self.assertMaxNumQueries(budget):
+                    response = self.authorized_client.get(page_name)
+                self.assertEqual(
+                    len(response.context['page_obj']),
+                    settings.POSTS_PER_PAGE
+                )
+
+
+class CountedPaginatorTests(TestCase):
+    def test_elided_page_range(self):
+        """Окно ссылок ограничено и не зависит от числа страниц."""
+        paginator = CountedPaginator(
+            Post.objects.order_by('-pub_date'),
+            settings.POSTS_PER_PAGE,
+            count=settings.POSTS_PER_PAGE * 50000,
+        )
+        ellipsis = CountedPaginator.ELLIPSIS
+        cases = (
+            (1, [1, 2, 3, 4, ellipsis, 50000]),
+            (100, [1, ellipsis, 97, 98, 99, 100, 101, 102, 103,
+                   ellipsis, 50000]),
+            (50000, [1, ellipsis, 49997, 49998, 49999, 50000]),
+        )
+        for number, expected in cases:
+            with self.subTest(number=number):
+                self.assertEqual(
+                    list(paginator.get_elided_page_range(number)), expected
+                )
+
+    def test_count_from_counter(self):
+        """Переданное число объектов заменяет COUNT(*)."""
+        paginator = CountedPaginator(
+            Post.objects.order_by('-pub_date'),
+            settings.POSTS_PER_PAGE,
+            count=lambda: 25,
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.num_pages, 3)
+
+
+class SearchViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_searcher')
+        cls.best = Post.objects.create(
+            author=cls.user, text='Котики, котики и еще раз котики'
+        )
+        cls.other = Post.objects.create(
+            author=cls.user, text='Про котиков и <b>собак</b>'
+        )
+        Post.objects.create(author=cls.user, text='Совсем про другое')
+
+    def search(self, query, **params):
+        return self.client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+
+    def test_results_are_ranked_and_highlighted(self):
+        """
+        Результаты упорядочены по релевантности, совпадения
+        подсвечены, а текст поста экранирован.
+        """
+        response = self.search('котик')
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [SearchViewTests.best, SearchViewTests.other],
+        )
+        self.assertContains(response, '<mark>Котики</mark>')
+        self.assertContains(response, '&lt;b&gt;собак&lt;/b&gt;')
+        self.assertNotContains(response, '<b>собак</b>')
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        post = Post.objects.create(
+            author=SearchViewTests.user, text='Единорог'
+        )
+        self.assertEqual(
+            list(self.search('единорог').context['page_obj']), [post]
+        )
+        post.text = 'Пегас'
+        post.save()
+        self.assertEqual(len(self.search('единорог').context['page_obj']), 0)
+        self.assertEqual(
+            list(self.search('пегас').context['page_obj']), [post]
+        )
+        post.delete()
+        self.assertEqual(len(self.search('пегас').context['page_obj']), 0)
+
+    @override_settings(POSTS_PER_PAGE=1)
+    def test_results_are_keyset_paginated(self):
+        """Курсоры страниц поиска сохраняют запрос и порядок."""
+        first = self.search('котик').context['page_obj']
+        self.assertEqual(list(first), [SearchViewTests.best])
+        second = self.search(
+            'котик', after=first.paginator.next_cursor
+        ).context['page_obj']
+        self.assertEqual(list(second), [SearchViewTests.other])
+        self.assertFalse(second.has_next())
+        previous = self.search(
+            'котик', before=second.paginator.previous_cursor
+        ).context['page_obj']
+        self.assertEqual(list(previous), [SearchViewTests.best])
+
+    def test_query_syntax_is_not_interpreted(self):
+        """Операторы FTS5 во вводе считаются обычными словами."""
+        for query in ('"котики', 'котики OR', 'NEAR(', '*', ''):
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query).status_code, 200)
+
+
+class ExportViewTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_exporter')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f'Пост, "{number}"')
+            for number in range(5)
+        )
+        Post.objects.create(author=cls.user, text='Пост без группы')
+
+    def export(self, url, file_format):
+        response = self.client.get(url, {'format': file_format})
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_profile_export_jsonl(self):
+        """Выгрузка профиля — все посты автора в JSON Lines."""
+        url = reverse('posts:profile_export', args=['test_exporter'])
+        with self.assertMaxNumQueries(4):
+            lines = self.export(url, 'jsonl').splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(len(records), 6)
+        self.assertEqual(
+            {record['author'] for record in records}, {'test_exporter'}
+        )
+        texts = {record['text'] for record in records}
+        self.assertIn('Пост без группы', texts)
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_group_export_csv(self):
+        """Выгрузка группы — посты группы в CSV с заголовком."""
+        url = reverse('posts:group_export', args=['test-slug'])
+        rows = list(csv.DictReader(self.export(url, 'csv').splitlines()))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['group_title'], 'Тестовая группа')
+        self.assertIn('Пост, "0"', {row['text'] for row in rows})
+
+    def test_unknown_format_not_found(self):
+        url = reverse('posts:group_export', args=['test-slug'])
+        response = self.client.get(url, {'format': 'xml'})
+        self.assertEqual(response.status_code, 404)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_author')
+        cls.reader = User.objects.create_user(username='test_reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост'
+        )
+
+    def setUp(self):
+        self.client.force_login(ConditionalGetTests.reader)
+
+    def tearDown(self):
+        cache.clear()
+
+    def revalidate(self, url, response):
+        return self.client.get(
+            url,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+
+    def test_unchanged_pages_not_rendered(self):
+        """Неизменившаяся страница отдается как 304 без шаблона."""
+        for url in (
+            reverse('posts:group_list', args=['test-slug']),
+            reverse('posts:profile', args=['test_author']),
+            reverse('posts:post_detail', args=[self.post.id]),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('no-cache', response['Cache-Control'])
+                response = self.revalidate(url, response)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+
+    def test_changes_invalidate_validators(self):
+        """Новые посты, комментарии, правки и подписки меняют ETag."""
+        group_url = reverse('posts:group_list', args=['test-slug'])
+        profile_url = reverse('posts:profile', args=['test_author'])
+        post_url = reverse('posts:post_detail', args=[self.post.id])
+        changes = (
+            (group_url, lambda: Post.objects.create(
+                author=self.author, group=self.group, text='Новый пост'
+            )),
+            (post_url, lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'
+            )),
+            (group_url, lambda: Post.objects.filter(
+                group=self.group
+            ).first().save()),
+            (profile_url, lambda: Follow.objects.create(
+                user=self.reader, author=self.author
+            )),
+        )
+        for url, change in changes:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                change()
+                response = self.revalidate(url, response)
+                self.assertEqual(response.status_code, 200)
+
+
+class FeedTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост'
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_feeds_list_posts(self):
+        """Каналы RSS и Atom содержат посты своей ленты."""
+        for name, args in (
+            ('posts', []),
+            ('group', ['test-slug']),
+            ('profile', ['test_author']),
+        ):
+            for feed_format, content_type in (
+                ('rss', 'application/rss+xml'),
+                ('atom', 'application/atom+xml'),
+            ):
+                url = reverse(f'posts:{name}_{feed_format}', args=args)
+                with self.subTest(url=url):
+                    response = self.client.get(url)
+                    self.assertTrue(
+                        response['Content-Type'].startswith(content_type)
+                    )
+                    self.assertContains(response, 'Тестовый пост')
+                    self.assertContains(
+                        response,
+                        reverse('posts:post_detail', args=[self.post.id]),
+                    )
+
+    def test_polling_is_cheap(self):
+        """
+        Повторный опрос канала — 304 по If-Modified-Since либо ответ
+        из кэша; новый пост сбрасывает и то и другое.
+        """
+        url = reverse('posts:group_rss', args=['test-slug'])
+        response = self.client.get(url)
+        with self.assertMaxNumQueries(1):
+            cached = self.client.get(url)
+        self.assertEqual(cached.content, response.content)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(
+            author=self.author, group=self.group, text='Новый пост'
+        )
+        response = self.client.get(url)
+        self.assertContains(response, 'Новый пост')
+
+
+@override_settings(COMMENTS_PER_PAGE=20)
+class CommentPaginationTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.post = Post.objects.create(
+            author=User.objects.create_user(username='test_author'),
+            text='Популярный пост',
+        )
+        Comment.objects.bulk_create(
+            Comment(
+                post=cls.post,
+                author=User.objects.create_user(username=f'reader_{number}'),
+                text=f'Комментарий {number}',
+            )
+            for number in range(25)
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_first_page_inline_rest_from_fragment(self):
+        """
+        Страница поста выводит первую страницу комментариев с
+        авторами за фиксированное число запросов, остальные
+        отдает фрагмент по курсору.
+        """
+        with self.assertMaxNumQueries(4):
+            response = self.client.get(
+                reverse('posts:post_detail', args=[self.post.id])
+            )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 20)
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, 'data-fragment=')
+        with self.assertMaxNumQueries(2):
+            fragment = self.client.get(
+                reverse('posts:post_comments', args=[self.post.id]),
+                {'after': comments.paginator.next_cursor},
+            )
+        self.assertEqual(len(fragment.context['comments']), 5)
+        self.assertContains(fragment, 'Комментарий 24')
+        self.assertNotContains(fragment, 'Комментарий 19')
+        self.assertNotContains(fragment, 'data-fragment=')
+
+    def test_fragment_for_missing_post(self):
+        response = self.client.get(reverse('posts:post_comments', args=[0]))
+        self.assertEqual(response.status_code, 404)
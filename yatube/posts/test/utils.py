@@ -0,0 +1,26 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    Примесь для TestCase: проверяет, что код укладывается
+    в заявленное число SQL-запросов (бюджет), и при превышении
+    выводит все выполненные запросы.
+    """
+
+    @contextmanager
+    def assertMaxNumQueries(self, num, using=DEFAULT_DB_ALIAS):
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        executed = len(context)
+        if executed > num:
+            queries = '\n'.join(
+                f'{i}. {query["sql"]}'
+                for i, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(
+                f'Выполнено {executed} запросов при бюджете {num}:\n{queries}'
+            )
@@ -0,0 +1,227 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.middleware import timed
+
+from . import page_cache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Миниатюра для <img src> и браузеров без поддержки srcset.
+DEFAULT_ALIAS = 'card'
+
+# Так sorl помечает в кэше ключи, которых нет в БД.
+EMPTY_VALUE = cached_db_kvstore.EMPTY_VALUE
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def thumbnail_options(source, geometry, options):
+    """
+    Полный набор опций миниатюры так же, как его собирает
+    ThumbnailBackend.get_thumbnail: от опций зависит имя файла.
+    """
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def source_file(image):
+    """
+    Картинка поста (файл поля или имя) для sorl. Хранилище поля
+    входит в ключ миниатюры, поэтому указывается явно.
+    """
+    return ImageFile(image, Post._meta.get_field('image').storage)
+
+
+def thumbnail_file(image, alias):
+    """Миниатюра размера alias, какой ее сохранит sorl (без чтения файла)."""
+    geometry, options = settings.POST_THUMBNAILS[alias]
+    source = source_file(image)
+    name = default.backend._get_thumbnail_filename(
+        source, geometry, thumbnail_options(source, geometry, options)
+    )
+    return ImageFile(name, default.storage)
+
+
+def lookup(image, alias):
+    """
+    Готовая миниатюра изображения или None.
+
+    Только чтение из хранилища ключей sorl: файл миниатюры здесь
+    никогда не создается и исходное изображение не открывается.
+    """
+    if not image:
+        return None
+    return lookup_many([image], [alias])[image.name][alias]
+
+
+def lookup_many(images, aliases=None):
+    """
+    Готовые миниатюры для набора картинок:
+    {имя картинки: {размер: миниатюра или None}}.
+
+    Хранилище ключей sorl опрашивается одним get_many к кэшу и не
+    более чем одним запросом к БД на все картинки и размеры, а не
+    по запросу на каждую миниатюру, как делает тег {% thumbnail %}.
+    """
+    aliases = list(aliases or settings.POST_THUMBNAILS)
+    keys = {
+        (image.name, alias): add_prefix(thumbnail_file(image, alias).key)
+        for image in images if image
+        for alias in aliases
+    }
+    if not keys:
+        return {}
+    thumbnails = {}
+    kvstore = default.kvstore
+    if not isinstance(kvstore, cached_db_kvstore.KVStore):
+        for name, alias in keys:
+            thumbnails.setdefault(name, {})[alias] = kvstore.get(
+                thumbnail_file(name, alias)
+            )
+        return thumbnails
+    values = _get_many_raw(kvstore, list(keys.values()))
+    for (name, alias), key in keys.items():
+        value = values.get(key, EMPTY_VALUE)
+        thumbnails.setdefault(name, {})[alias] = (
+            None if value == EMPTY_VALUE else deserialize_image_file(value)
+        )
+    return thumbnails
+
+
+def _get_many_raw(kvstore, keys):
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        stored = dict(
+            KVStoreModel.objects.filter(
+                key__in=missing
+            ).values_list('key', 'value')
+        )
+        kvstore.cache.set_many(
+            {key: stored.get(key, EMPTY_VALUE) for key in missing},
+            sorl_settings.THUMBNAIL_CACHE_TIMEOUT,
+        )
+        values.update(stored)
+    return values
+
+
+def picture(image, variants):
+    """
+    Данные для разметки <picture> картинки поста.
+
+    Миниатюры с явным форматом (WEBP) группируются в <source> с
+    MIME-типом и srcset по ширине — браузер сам выбирает формат и
+    размер. Миниатюры без явного формата (JPEG) попадают в srcset тега
+    <img>; пока их нет, показывается исходная картинка.
+    """
+    sources = {}
+    fallback = []
+    for alias, (geometry, options) in settings.POST_THUMBNAILS.items():
+        thumbnail = variants.get(alias)
+        if thumbnail is None:
+            continue
+        candidate = f'{thumbnail.url} {thumbnail.width}w'
+        image_format = options.get('format')
+        if image_format:
+            mime_type = f'image/{image_format.lower()}'
+            sources.setdefault(mime_type, []).append(candidate)
+        else:
+            fallback.append(candidate)
+    default_thumbnail = variants.get(DEFAULT_ALIAS)
+    return {
+        'src': default_thumbnail.url if default_thumbnail else image.url,
+        'srcset': ', '.join(fallback),
+        'sources': [
+            {'type': mime_type, 'srcset': ', '.join(candidates)}
+            for mime_type, candidates in sources.items()
+        ],
+        'sizes': settings.POST_IMAGE_SIZES,
+    }
+
+
+def generate(name):
+    """
+    Создает миниатюры всех размеров из POST_THUMBNAILS.
+
+    Готовые миниатюры меняют время изменения постов с этой
+    картинкой, что сбрасывает их карточки и страницы.
+    """
+    try:
+        source = source_file(name)
+        with timed('thumbnails'):
+            for geometry, options in settings.POST_THUMBNAILS.values():
+                get_thumbnail(source, geometry, **options)
+        refresh_posts(name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+
+
+def refresh_posts(name):
+    """
+    Отмечает посты с картинкой измененными одним UPDATE в обход
+    сигналов и один раз сбрасывает их ленты: ключи карточек и
+    валидаторы страниц поста включают updated.
+    """
+    posts = Post.objects.filter(image=name)
+    scopes = {'global'}
+    for username, slug in posts.order_by().values_list(
+        'author__username', 'group__slug'
+    ).distinct():
+        scopes.add(f'author:{username}')
+        if slug:
+            scopes.add(f'group:{slug}')
+    posts.update(updated=timezone.now())
+    page_cache.invalidate(*scopes)
+
+
+def generate_in_worker(name):
+    """generate() для потока пула: закрывает соединение потока с БД."""
+    try:
+        generate(name)
+    finally:
+        connection.close()
+
+
+def schedule(name):
+    """
+    Ставит создание миниатюр в очередь после фиксации транзакции.
+    При THUMBNAIL_WORKERS = 0 миниатюры создаются в том же потоке.
+    """
+    if settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(lambda: get_executor().submit(
+            generate_in_worker, name
+        ))
+    else:
+        transaction.on_commit(lambda: generate(name))
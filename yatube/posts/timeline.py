@@ -0,0 +1,98 @@
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Follow, Post, TimelineEntry
+
+
+def _bulk_create(entries):
+    """Сохраняет записи ленты пачками, не собирая их все в памяти."""
+    batch_size = settings.TIMELINE_BATCH_SIZE
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, batch_size))
+        if not batch:
+            break
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out(post):
+    """Добавляет новый пост в ленты всех подписчиков автора."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _bulk_create(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.id,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    """Переносит в ленту подписчика уже опубликованные посты автора."""
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('id', 'pub_date')
+    _bulk_create(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def backfill_many(follows):
+    """backfill() для набора подписок (user_id, author_id) одним чтением."""
+    followers = {}
+    for user_id, author_id in follows:
+        followers.setdefault(author_id, []).append(user_id)
+    posts = Post.objects.filter(
+        author_id__in=followers
+    ).values_list('id', 'author_id', 'pub_date')
+    _bulk_create(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, author_id, pub_date in posts.iterator()
+        for user_id in followers[author_id]
+    )
+
+
+def fill_for_posts(first_id, last_id):
+    """
+    Ленты для постов с id от first_id до last_id одним
+    INSERT ... SELECT из подписок, без строк в памяти Python. Для
+    только что загруженных постов, у которых записей в лентах еще
+    нет; возвращает число добавленных записей.
+    """
+    entry, post, follow = (
+        connection.ops.quote_name(model._meta.db_table)
+        for model in (TimelineEntry, Post, Follow)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {entry} (user_id, post_id, author_id, pub_date) '
+            f'SELECT follow.user_id, post.id, post.author_id, post.pub_date '
+            f'FROM {post} post '
+            f'INNER JOIN {follow} follow '
+            f'ON follow.author_id = post.author_id '
+            f'WHERE post.id BETWEEN %s AND %s',
+            [first_id, last_id],
+        )
+        return cursor.rowcount
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты подписчика посты автора после отписки."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
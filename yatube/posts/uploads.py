@@ -0,0 +1,101 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from PIL import Image, ImageOps, ImageSequence
+
+# Параметры пересохранения для форматов, которые принимает сайт.
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 85},
+    'GIF': {'optimize': True},
+}
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Пишет каждый загружаемый файл на диск кусками, не держа его в
+    памяти целиком. Данные сверх POST_IMAGE_MAX_BYTES не
+    сохраняются, а файл помечается как обрезанный — форма его
+    отклонит, не открывая.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.truncated = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.POST_IMAGE_MAX_BYTES:
+            self.truncated = True
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        uploaded.truncated = self.truncated
+        return uploaded
+
+
+def normalize_image(upload):
+    """
+    Приводит загруженную картинку к ограниченному виду.
+
+    Формат и размеры (с учетом всех кадров анимации) проверяются по
+    заголовку до декодирования пикселей. Затем картинка
+    поворачивается по EXIF, уменьшается до POST_IMAGE_MAX_SIDE и
+    пересохраняется в том же формате без метаданных поверх
+    временного файла загрузки, так что имя файла сохраняется.
+    """
+    upload.seek(0)
+    with Image.open(upload) as image:
+        image_format = image.format
+        if image_format not in SAVE_OPTIONS:
+            raise ValidationError(
+                'Поддерживаются только JPEG, PNG, WEBP и GIF.',
+                code='unsupported_format',
+            )
+        width, height = image.size
+        frames = getattr(image, 'n_frames', 1)
+        if width * height * frames > settings.POST_IMAGE_MAX_PIXELS:
+            raise ValidationError(
+                'Слишком большое разрешение картинки.', code='too_many_pixels'
+            )
+        if getattr(image, 'is_animated', False):
+            frames = _resized_frames(image)
+            options = {
+                'save_all': True,
+                'append_images': frames[1:],
+                'duration': [frame.info.get('duration', 100)
+                             for frame in frames],
+                'loop': image.info.get('loop', 0),
+            }
+            normalized = frames[0]
+        else:
+            max_side = settings.POST_IMAGE_MAX_SIDE
+            # JPEG можно декодировать сразу в уменьшенном масштабе.
+            image.draft(None, (max_side, max_side))
+            normalized = ImageOps.exif_transpose(image)
+            normalized.thumbnail((max_side, max_side))
+            options = {}
+    if image_format == 'JPEG' and normalized.mode not in ('RGB', 'L'):
+        normalized = normalized.convert('RGB')
+    upload.seek(0)
+    upload.truncate()
+    normalized.save(
+        upload, format=image_format, **SAVE_OPTIONS[image_format], **options
+    )
+    upload.size = upload.tell()
+    upload.seek(0)
+    return upload
+
+
+def _resized_frames(image):
+    """Кадры анимации, уменьшенные до POST_IMAGE_MAX_SIDE, без EXIF."""
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    frames = []
+    for frame in ImageSequence.Iterator(image):
+        resized = frame.copy()
+        resized.thumbnail((max_side, max_side))
+        resized.info = {'duration': frame.info.get('duration', 100)}
+        frames.append(resized)
+    return frames
@@ -1,9 +1,218 @@
+import base64
+import binascii
+
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+CURSOR_SEPARATOR = '|'
+
+
+class CountedPaginator(Paginator):
+    """
+    Постраничный вывод по номерам страниц с ограниченным окном ссылок.
+
+    Число объектов можно передать готовым (или функцией, которая
+    его вернет), например из денормализованного счетчика: тогда
+    COUNT(*) не выполняется, а число страниц приблизительное.
+    """
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, count=None, on_each_side=3,
+                 on_ends=1, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if callable(count):
+            count = count()
+        if count is not None:
+            self.count = count
+        self.on_each_side = on_each_side
+        self.on_ends = on_ends
+        self.elided_page_range = []
+
+    def page(self, number):
+        page = super().page(number)
+        self.elided_page_range = list(
+            self.get_elided_page_range(page.number)
+        )
+        return page
+
+    def get_elided_page_range(self, number):
+        """
+        Номера страниц вокруг текущей и по краям, пропуски между ними
+        обозначены ELLIPSIS. Длина не зависит от общего числа страниц.
+        """
+        on_each_side, on_ends = self.on_each_side, self.on_ends
+        num_pages = self.num_pages
+        if num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(num_pages - on_ends + 1, num_pages + 1)
+        else:
+            yield from range(number + 1, num_pages + 1)
+
+
+class KeysetPaginator(Paginator):
+    """
+    Основа постраничного вывода по ключу сортировки.
+
+    Вместо COUNT(*) и OFFSET страница выбирается условием на ключ
+    крайней записи соседней страницы, поэтому запрос стоит одинаково
+    на любой глубине. Общее число страниц неизвестно: номер страницы
+    условный (1 — начало, 2 — любая другая), а num_pages говорит
+    только о том, есть ли следующая страница.
+
+    Подклассы выбирают записи (_fetch_rows) и переводят ключ записи
+    в строки курсора и обратно (_key_values, _parse_key).
+    """
+    uses_cursor = True
+
+    def __init__(self, object_list, per_page):
+        super().__init__(object_list, per_page)
+        self.next_cursor = None
+        self.previous_cursor = None
+        self._number = 1
+
+    @property
+    def count(self):
+        return None
+
+    @property
+    def num_pages(self):
+        return self._number + bool(self.next_cursor)
+
+    def page_by_cursor(self, after=None, before=None):
+        after, before = self.decode(after), self.decode(before)
+        limit = self.per_page + 1
+        if before is not None:
+            rows = self._fetch_rows(before, reverse=True, limit=limit)
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_next = True
+        else:
+            rows = self._fetch_rows(after, reverse=False, limit=limit)
+            has_previous = after is not None
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+        if rows and has_previous:
+            self.previous_cursor = self.encode(rows[0])
+        if rows and has_next:
+            self.next_cursor = self.encode(rows[-1])
+        self._number = 1 + bool(self.previous_cursor)
+        return Page(rows, self._number, self)
+
+    def encode(self, row):
+        raw = CURSOR_SEPARATOR.join(self._key_values(row)).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def decode(self, token):
+        """Разбирает курсор; испорченный курсор считается отсутствующим."""
+        if not token:
+            return None
+        try:
+            values = base64.urlsafe_b64decode(token.encode()).decode()
+            return self._parse_key(values.split(CURSOR_SEPARATOR))
+        except (binascii.Error, UnicodeError, ValueError, ValidationError):
+            return None
+
+    def _fetch_rows(self, key, reverse, limit):
+        """
+        До limit записей строго после ключа key (None — с начала)
+        в порядке сортировки, при reverse — в обратном.
+        """
+        raise NotImplementedError
+
+    def _key_values(self, row):
+        """Строки ключа сортировки записи."""
+        raise NotImplementedError
+
+    def _parse_key(self, values):
+        """Ключ из строк курсора; ValueError — курсор испорчен."""
+        raise NotImplementedError
+
+
+class CursorPaginator(KeysetPaginator):
+    """Постраничный вывод queryset по ключу сортировки (pub_date, id)."""
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id')):
+        super().__init__(object_list.order_by(*ordering), per_page)
+        self.ordering = ordering
+
+    def _fetch_rows(self, key, reverse, limit):
+        if reverse:
+            queryset = self.object_list.order_by(*self._reversed_ordering())
+        else:
+            queryset = self.object_list
+        if key is not None:
+            queryset = queryset.filter(self._keyset_filter(key, reverse))
+        return list(queryset[:limit])
+
+    def _key_values(self, obj):
+        values = []
+        for name in self._key_names():
+            value = getattr(obj, name)
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            values.append(str(value))
+        return values
+
+    def _parse_key(self, values):
+        names = self._key_names()
+        if len(values) != len(names):
+            raise ValueError('Неверное число полей в курсоре')
+        model_meta = self.object_list.model._meta
+        return [
+            model_meta.get_field(name).to_python(value)
+            for name, value in zip(names, values)
+        ]
+
+    def _key_names(self):
+        return [key.lstrip('-') for key in self.ordering]
+
+    def _reversed_ordering(self):
+        return [
+            key[1:] if key.startswith('-') else f'-{key}'
+            for key in self.ordering
+        ]
+
+    def _keyset_filter(self, values, reverse=False):
+        """
+        Условие «строго после ключа» в порядке сортировки:
+        (a < x) OR (a = x AND b < y) для убывающих полей.
+        """
+        condition = Q()
+        equal = {}
+        for key, value in zip(self.ordering, values):
+            descending = key.startswith('-') != reverse
+            name = key.lstrip('-')
+            lookup = f'{name}__lt' if descending else f'{name}__gt'
+            condition |= Q(**equal, **{lookup: value})
+            equal[name] = value
+        return condition
 
 
-def paginator(post_list, request):
-    paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+def paginator(post_list, request, ordering=('-pub_date', '-id'), count=None):
+    if 'page' in request.GET:
+        paginator = CountedPaginator(
+            post_list.order_by(*ordering),
+            settings.POSTS_PER_PAGE,
+            count=count,
+        )
+        page_number = request.GET.get('page')
+        return paginator.get_page(page_number)
+    paginator = CursorPaginator(
+        post_list, settings.POSTS_PER_PAGE, ordering=ordering
+    )
+    return paginator.page_by_cursor(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
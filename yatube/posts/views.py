@@ -1,58 +1,108 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.utils.http import urlencode
 
+from .conditional import (conditional_page, group_state, is_following,
+                          post_state, profile_state)
+from .counters import total_posts, user_stats
+from .export import CONTENT_TYPES, export_response
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
-from .utils import paginator
+from .page_cache import cache_page_versioned
+from .models import Follow, Group, Post, TimelineEntry
+from .search import fts_query, search_posts
+from .utils import CursorPaginator, paginator
 
 User = get_user_model()
 
 
-@cache_page(20 * 1, key_prefix='index_page')
+@cache_page_versioned('global')
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.all()
+    post_list = Post.objects.select_related('author', 'group')
     context = {
-        'page_obj': paginator(post_list, request),
+        'page_obj': paginator(post_list, request, count=total_posts),
     }
     return render(request, template, context)
 
 
+@conditional_page(group_state, 'group:{slug}')
+@cache_page_versioned('group:{slug}')
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
+    post_list = group.posts.select_related('author', 'group')
     context = {
         'group': group,
-        'page_obj': paginator(post_list, request),
+        'page_obj': paginator(post_list, request, count=group.posts_count),
     }
     return render(request, template, context)
 
 
+@conditional_page(profile_state, 'author:{username}')
+@cache_page_versioned('author:{username}')
 def profile(request, username):
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    following = (
-        request.user.is_authenticated and Follow.objects.filter(
-            user=request.user,
-            author=author
-        ).exists()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
     )
+    post_list = author.posts.select_related('author', 'group')
+    following = is_following(request, author.pk)
     context = {
         'author': author,
-        'page_obj': paginator(post_list, request),
+        'page_obj': paginator(
+            post_list, request, count=user_stats(author).posts_count
+        ),
         'following': following,
     }
     return render(request, template, context)
 
 
+def _export_format(request):
+    file_format = request.GET.get('format', 'jsonl')
+    if file_format not in CONTENT_TYPES:
+        raise Http404(f'Неизвестный формат выгрузки: {file_format}')
+    return file_format
+
+
+def group_export(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return export_response(
+        Post.objects.filter(group=group), _export_format(request), slug
+    )
+
+
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    return export_response(
+        Post.objects.filter(author=author), _export_format(request), username
+    )
+
+
+def _comments_page(post, after=None):
+    """
+    Страница комментариев поста по ключу (pub_date, id) вместе с
+    авторами: запрос не зависит ни от числа комментариев, ни от
+    глубины страницы.
+    """
+    paginator = CursorPaginator(
+        post.comment.select_related('author'),
+        settings.COMMENTS_PER_PAGE,
+        ordering=('pub_date', 'id'),
+    )
+    return paginator.page_by_cursor(after=after)
+
+
+@conditional_page(post_state)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, id=post_id)
-    comment = post.comment.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id
+    )
+    user_stats(post.author)
     form = CommentForm(
         request.POST or None,
         files=request.FILES or None
@@ -60,12 +110,26 @@ def post_detail(request, post_id):
     context = {
         'post': post,
         'form': form,
-        'comments': comment
+        'comments': _comments_page(
+            post, after=request.GET.get('comments_after')
+        ),
+    }
+    return render(request, template, context)
+
+
+def post_comments(request, post_id):
+    """Фрагмент со следующей страницей комментариев для подгрузки."""
+    template = 'posts/includes/comments.html'
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    context = {
+        'post': post,
+        'comments': _comments_page(post, after=request.GET.get('after')),
     }
     return render(request, template, context)
 
 
 @login_required
+@transaction.atomic
 def post_create(request):
     template = 'posts/create_post.html'
     form = PostForm(
@@ -81,6 +145,7 @@ def post_create(request):
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     template = 'posts/create_post.html'
     post = get_object_or_404(Post, id=post_id)
@@ -103,6 +168,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -117,14 +183,30 @@ def add_comment(request, post_id):
 @login_required
 def follow_index(request):
     template = 'posts/follow.html'
-    post_list = Post.objects.filter(author__following__user=request.user)
+    timeline = TimelineEntry.objects.filter(
+        user=request.user
+    ).select_related('post__author', 'post__group')
+    page_obj = paginator(timeline, request, ordering=('-pub_date', '-post_id'))
+    page_obj.object_list = [entry.post for entry in page_obj]
+    context = {
+        'page_obj': page_obj
+    }
+    return render(request, template, context)
+
+
+def search(request):
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
     context = {
-        'page_obj': paginator(post_list, request)
+        'query': query,
+        'page_obj': search_posts(query, request) if fts_query(query) else None,
+        'page_query': urlencode({'q': query}) + '&',
     }
     return render(request, template, context)
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
@@ -136,6 +218,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     follow_objects = Follow.objects.filter(
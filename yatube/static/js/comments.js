@@ -0,0 +1,24 @@
+// Подгружает следующую страницу комментариев вместо кнопки «Показать еще».
+// Без JavaScript кнопка ведет на страницу поста с этой страницей комментариев.
+document.addEventListener('click', function (event) {
+  var link = event.target.closest('[data-fragment]');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  link.classList.add('disabled');
+  fetch(link.dataset.fragment, {credentials: 'same-origin'})
+    .then(function (response) {
+      if (!response.ok) {
+        throw new Error(response.statusText);
+      }
+      return response.text();
+    })
+    .then(function (html) {
+      var fragment = document.createRange().createContextualFragment(html);
+      link.closest('[data-comments-more]').replaceWith(fragment);
+    })
+    .catch(function () {
+      window.location = link.href;
+    });
+});
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -53,6 +54,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,6 +65,22 @@ MIDDLEWARE = [
     'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+# Отдавать ли профиль запроса в заголовке Server-Timing. Строка
+# профиля пишется в лог core.middleware с уровнем INFO всегда.
+SERVER_TIMING_HEADER = True
+
+# Метрики для Prometheus: каждый процесс раз в METRICS_FLUSH_INTERVAL
+# секунд пишет свои счетчики в файл этого каталога, /metrics их
+# складывает. Каталог лежит вне дерева исходников, задается
+# переменной окружения и очищается при выкладке.
+METRICS_DIR = os.environ.get(
+    'YATUBE_METRICS_DIR',
+    os.path.join(tempfile.gettempdir(), 'yatube-metrics'),
+)
+METRICS_FLUSH_INTERVAL = 1
+# Адреса, с которых доступен /metrics.
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
@@ -158,14 +176,92 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загрузки всегда пишутся на диск кусками; данные сверх
+# POST_IMAGE_MAX_BYTES отбрасываются, и форма отклоняет файл.
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.LimitedTemporaryFileUploadHandler',
+]
+
+POST_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+
+# Предел разрешения проверяется по заголовку до декодирования.
+POST_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+
+# Длинная сторона сохраняемого оригинала.
+POST_IMAGE_MAX_SIDE = 2560
+
+# Кэш общий для всех процессов: версии областей страниц хранятся
+# в нем же, и сброс после записи сразу видят все воркеры. Каталог
+# лежит вне дерева исходников и задается переменной окружения.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_DIR',
+            os.path.join(tempfile.gettempdir(), 'yatube-cache'),
+        ),
+        'OPTIONS': {'MAX_ENTRIES': 50000},
     }
 }
 
+# Бэкенд страниц, карточек и их версий: memcached, redis или файловый
+# кэш. С LocMemCache (свой в каждом процессе) сроки хранения
+# урезаются до PAGE_CACHE_LOCAL_TIMEOUT секунд.
+PAGE_CACHE_ALIAS = 'default'
+
+PAGE_CACHE_LOCAL_TIMEOUT = 20
+
+PAGE_CACHE_ENABLED = True
+
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+# Миниатюры создаются при сохранении поста, а страницы только
+# ищут готовые: имя размера -> (геометрия, опции sorl-thumbnail).
+# Размеры с форматом WEBP выводятся в <source> тега <picture>,
+# остальные sorl сохраняет в JPEG (THUMBNAIL_FORMAT по умолчанию)
+# для старых браузеров.
+POST_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+    'card_480': ('480x170', {'crop': 'center', 'upscale': True}),
+    'card_webp': ('960x339', {
+        'crop': 'center', 'upscale': True, 'format': 'WEBP', 'quality': 80,
+    }),
+    'card_480_webp': ('480x170', {
+        'crop': 'center', 'upscale': True, 'format': 'WEBP', 'quality': 80,
+    }),
+}
+
+# Атрибут sizes для srcset карточек: ширина колонки с постами.
+POST_IMAGE_SIZES = '(max-width: 992px) 100vw, 960px'
+
+# Число потоков, создающих миниатюры; 0 — создавать их сразу
+# после фиксации транзакции в потоке запроса.
+THUMBNAIL_WORKERS = 2
+
 POSTS_PER_PAGE = 10
 
+# Комментарии на странице поста; следующие подгружаются по кнопке.
+COMMENTS_PER_PAGE = 20
+
+# Число записей в RSS/Atom и длина их заголовков в словах.
+FEED_ITEMS = 20
+FEED_TITLE_WORDS = 10
+
+# Наибольший размер страницы, который клиент API может запросить.
+API_MAX_LIMIT = 100
+
+POSTS_COUNT_CACHE_TIMEOUT = 60 * 5
+
+# Сколько строк админка пересчитывает для отфильтрованного списка.
+ADMIN_COUNT_CAP = 10000
+
+TIMELINE_BATCH_SIZE = 1000
+
+# Сколько строк выгрузки читается из БД и отдается клиенту за раз.
+EXPORT_CHUNK_SIZE = 2000
+
 LIMIT_CHARACTERS_FOR_POST = 15
 
 POSTS_TO_CHECK_PAGINATOR = 12